@@ -0,0 +1,178 @@
+"""
+Batch translation of a directory tree of Java files.
+Files are translated in a pool of worker processes; the output tree mirrors
+the layout of the input tree, with .java replaced by .py.
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from main import translate_str
+from lexer import DEFAULT_ENGINE
+from cache import TranslationCache, DEFAULT_CACHE_SIZE, cache_variant, translator_fingerprint
+
+# cache opened by this (worker) process, reused across its tasks
+_process_cache = None
+
+# file in the output directory naming the translator and options its files
+# were built with, see output_stamp
+STAMP_FILE = '.j2p-options'
+
+
+def _get_cache(cache_dir, max_bytes, variant):
+    global _process_cache
+    if (_process_cache is None or _process_cache.cache_dir != cache_dir or
+            _process_cache.variant != variant):
+        _process_cache = TranslationCache(cache_dir, max_bytes, variant)
+    return _process_cache
+
+
+def find_java_files(src_dir):
+    """
+    Walk src_dir and return the relative paths of all .java files, sorted.
+    """
+
+    found = []
+    for root, dirs, files in os.walk(src_dir):
+        dirs.sort() # deterministic walk order
+        for name in sorted(files):
+            if name.endswith('.java'):
+                found.append(os.path.relpath(os.path.join(root, name), src_dir))
+    return found
+
+
+def output_path(rel_path, out_dir):
+    # Foo/Bar.java -> OUT_DIR/Foo/Bar.py
+    return os.path.join(out_dir, os.path.splitext(rel_path)[0] + '.py')
+
+
+def options_variant(options):
+    # cache variant of a dict of main.translate_str keyword arguments
+    return cache_variant(options.get('optimize', False), options.get('buffered', False),
+                         options.get('main_function', False))
+
+
+def output_stamp(options):
+    """
+    Identifies the code translated with options (main.translate_str keyword
+    arguments) by the current translator, like a cache key without the source.
+    """
+
+    return translator_fingerprint() + options_variant(options)
+
+
+def read_stamp(out_dir):
+    # the stamp out_dir was last completely built with, or None
+    try:
+        with open(os.path.join(out_dir, STAMP_FILE), 'r', encoding='utf-8') as f:
+            return f.read()
+    except (IOError, UnicodeDecodeError):
+        return None
+
+
+def write_stamp(out_dir, stamp):
+    # record stamp for out_dir, or with None forget the one recorded
+    path = os.path.join(out_dir, STAMP_FILE)
+    if stamp is None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return
+    os.makedirs(out_dir, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(stamp)
+
+
+def translate_file(task):
+    """
+    Translate one file. Runs in a worker process.
+    Reads and writes the files itself so only paths cross process boundaries.
+    options is a dict of main.translate_str keyword arguments.
+    Returns (rel_path, bytes read, error message or None, cache hit);
+    errors never raise.
+    """
+
+    rel_path, src_dir, out_dir, engine, cache_dir, cache_size, options = task
+    src_path = os.path.join(src_dir, rel_path)
+    size = 0
+    hit = False
+    try:
+        with open(src_path, 'r', encoding='utf-8') as f:
+            java_src = f.read()
+        size = len(java_src.encode('utf-8'))
+        if cache_dir is not None:
+            cache = _get_cache(cache_dir, cache_size, options_variant(options))
+            py_code = cache.get(java_src)
+            hit = py_code is not None
+        if not hit:
+            py_code = translate_str(java_src, engine, **options)
+            if cache_dir is not None:
+                cache.put(java_src, py_code)
+        out_path = output_path(rel_path, out_dir)
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        with open(out_path, 'w', encoding='utf-8') as f:
+            f.write(py_code)
+    except SyntaxError as e:
+        return rel_path, size, f'Syntax error in Java code: {e}', hit
+    except (IOError, UnicodeDecodeError) as e:
+        return rel_path, size, f'I/O error: {e}', hit
+    except Exception as e:
+        return rel_path, size, f'Translation error: {e}', hit
+    return rel_path, size, None, hit
+
+
+def translate_tree(src_dir, out_dir, jobs=None, chunksize=16, engine=DEFAULT_ENGINE,
+                   cache_dir=None, cache_size=DEFAULT_CACHE_SIZE, **options):
+    """
+    Translate every .java file under src_dir into out_dir.
+    Errors are reported per file without stopping the run.
+    With cache_dir set, unchanged files are served from the translation cache.
+    options (optimize, buffered, main_function, intern, stream) are passed on
+    to main.translate_str. Once every file is translated, out_dir is stamped
+    with them (see output_stamp) for watch.watch_tree.
+    Returns the number of files that failed.
+    """
+
+    rel_paths = find_java_files(src_dir)
+    tasks = [(rel_path, src_dir, out_dir, engine, cache_dir, cache_size, options) for rel_path in rel_paths]
+    jobs = jobs or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    if jobs == 1:
+        # translate in this process, no pool startup cost
+        results = map(translate_file, tasks)
+        failed, total_bytes, hits = _report(results)
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            # files are sent to workers in chunks to amortize the IPC cost
+            results = pool.map(translate_file, tasks, chunksize=chunksize)
+            failed, total_bytes, hits = _report(results)
+    elapsed = time.perf_counter() - start
+    write_stamp(out_dir, None if failed else output_stamp(options))
+
+    count = len(tasks)
+    rate = count / elapsed if elapsed > 0 else 0.0
+    throughput = total_bytes / 1e6 / elapsed if elapsed > 0 else 0.0
+    print(f'Translated {count - failed}/{count} files from {src_dir!r} to {out_dir!r} '
+          f'in {elapsed:.2f}s ({rate:.1f} files/s, {throughput:.2f} MB/s, {jobs} jobs)')
+    if cache_dir is not None:
+        print(f'cache: {hits} hits, {count - hits} misses')
+    if failed:
+        print(f'{failed} file(s) failed', file=sys.stderr)
+    return failed
+
+
+def _report(results):
+    # print per-file errors as results arrive, return (failed, total bytes, cache hits)
+    failed = 0
+    total_bytes = 0
+    hits = 0
+    for rel_path, size, error, hit in results:
+        total_bytes += size
+        hits += hit
+        if error is not None:
+            failed += 1
+            print(f'{rel_path}: {error}', file=sys.stderr)
+    return failed, total_bytes, hits
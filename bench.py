@@ -0,0 +1,764 @@
+"""
+Benchmarks for the Java-to-Python translator.
+Run from the project directory, e.g.:
+    python bench.py memory --copies 500
+    python bench.py emit --depths 1 5 10 20 40
+    python bench.py intern --copies 2000
+    python bench.py pipeline --sizes 1000 10000 --json results.json
+    python bench.py compare before.json after.json
+    python bench.py incremental --lines 10000
+    python bench.py execute --sizes 100 1000 10000
+    python bench.py loops --iterations 100000
+    python bench.py optimize --iterations 100000
+    python bench.py prints --lines 1000000
+    python bench.py function --iterations 100000
+    python bench.py startup --import-budget 20
+    python bench.py mmap --mb 200
+    python bench.py parallel --mb 20 --jobs 1 2 4 8
+    python bench.py daemon --spawn --connections 16 --requests 2000
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import os
+import tracemalloc
+from lexer import lex_java, lex_java_buffer
+from parser import parse_module, Variable, BinaryCondition, VarUpdate
+from unittest import mock
+from emitter import emit_module
+from corpus import SHAPES, generate, input_style_source, nested_source
+from incremental import IncrementalTranslation
+from main import translate_str, translate_to_code
+
+PHASES = ('lex', 'parse', 'emit')
+
+
+class DictToken:
+    # token layout before __slots__, kept here as the memory baseline
+    def __init__(self, kind, value, pos):
+        self.kind = kind
+        self.value = value
+        self.pos = pos
+
+
+def traced_bytes(build):
+    """
+    Return (result, bytes still allocated by build() when it returns).
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def bench_memory(args):
+    src = input_style_source(args.copies)
+    print(f'source: {len(src) / 1e6:.2f} MB ({args.copies} copies of Input.java)')
+    
+    representations = [
+        ('Token with __dict__ (before)', lambda: [DictToken(t.kind, t.value, t.pos) for t in lex_java(src)]),
+        ('Token with __slots__', lambda: list(lex_java(src))),
+        ('TokenBuffer (arrays)', lambda: lex_java_buffer(src)),
+    ]
+    for label, build in representations:
+        start = time.perf_counter()
+        tokens, size = traced_bytes(build)
+        elapsed = time.perf_counter() - start
+        count = len(tokens)
+        print(f'{label:30s} {count} tokens  {size / count:7.1f} bytes/token  {elapsed:.2f}s (traced)')
+        del tokens
+
+
+def bench_emit(args):
+    # same total number of statements at every depth, so time should stay flat
+    for depth in args.depths:
+        copies = max(1, args.statements // (2 * depth))
+        mod = parse_module(lex_java(nested_source(depth, copies)))
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            out = emit_module(mod)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        out_lines = out.count('\n')
+        print(f'depth {depth:3d}: {out_lines} lines in {elapsed * 1000:8.2f} ms  '
+              f'{elapsed / out_lines * 1e6:6.2f} us/line')
+
+
+def bench_intern(args):
+    """
+    Parse and emit time and AST memory with and without interning
+    (parse_module(..., intern=True), emit_module(..., memoize=True)), on a
+    repetitive source, on nested blocks and on the less repetitive mixed shape.
+    """
+
+    sources = [
+        (f'Input.java x{args.copies}', input_style_source(args.copies)),
+        ('nested blocks', nested_source(8, args.copies)),
+        ('mixed', generate('mixed', 25 * args.copies)),
+    ]
+    for name, src in sources:
+        tokens = list(lex_java(src))
+        print(f'{name}: {len(tokens)} tokens')
+        for intern in (False, True):
+            mod, parse_time = best_time(lambda: parse_module(tokens, intern=intern), args.repeat)
+            _, emit_time = best_time(lambda: emit_module(mod, memoize=intern), args.repeat)
+            del mod
+            _, size = traced_bytes(lambda: parse_module(tokens, intern=intern))
+            label = 'interned' if intern else 'plain'
+            print(f'  {label:>8s}: parse {parse_time * 1000:8.1f} ms  emit {emit_time * 1000:8.1f} ms  '
+                  f'AST {size / 1e6:7.2f} MB')
+
+
+def best_time(fn, repeat):
+    """
+    Return (result of the last call, fastest of repeat timed calls of fn).
+    """
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def peak_memory(fn):
+    # peak bytes allocated while fn runs, measured separately from timing
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def bench_pipeline(args):
+    """
+    Time lex_java, parse_module and emit_module separately for every shape and
+    size of synthetic program, plus their peak memory.
+    Between consecutive sizes the scaling exponent of each phase is printed:
+    1.0 means time grows linearly with the number of tokens.
+    """
+
+    shapes = sorted(SHAPES) if args.shapes == ['all'] else args.shapes
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'runs': [],
+    }
+    for shape in shapes:
+        print(f'{shape}:')
+        previous = None
+        for size in args.sizes:
+            src = generate(shape, size)
+            tokens, lex_time = best_time(lambda: list(lex_java(src)), args.repeat)
+            mod, parse_time = best_time(lambda: parse_module(tokens), args.repeat)
+            out, emit_time = best_time(lambda: emit_module(mod), args.repeat)
+            run = {
+                'shape': shape,
+                'size': size,
+                'bytes': len(src),
+                'tokens': len(tokens),
+                'output_bytes': len(out),
+                'time': {'lex': lex_time, 'parse': parse_time, 'emit': emit_time},
+                'peak_memory': {
+                    'lex': peak_memory(lambda: list(lex_java(src))),
+                    'parse': peak_memory(lambda: parse_module(tokens)),
+                    'emit': peak_memory(lambda: emit_module(mod)),
+                },
+            }
+            report['runs'].append(run)
+
+            total = lex_time + parse_time + emit_time
+            line = (f'  size {size:7d}: {len(tokens):8d} tokens  '
+                    f'{len(tokens) / total:10.0f} tokens/s  ')
+            line += '  '.join(f'{phase} {run["time"][phase] * 1000:8.1f} ms '
+                              f'{run["peak_memory"][phase] / 1e6:6.1f} MB' for phase in PHASES)
+            if previous is not None and len(tokens) > previous['tokens']:
+                growth = math.log(len(tokens) / previous['tokens'])
+                exponents = [math.log(max(run['time'][phase], 1e-9) / max(previous['time'][phase], 1e-9)) / growth
+                             for phase in PHASES]
+                line += '  scaling ' + '/'.join(f'{e:.2f}' for e in exponents)
+            print(line)
+            previous = run
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'results written to {args.json}')
+
+
+def bench_compare(args):
+    """
+    Print per-phase time ratios between two pipeline result files.
+    Ratios below 1.0 mean the new results are faster.
+    """
+
+    with open(args.old, 'r', encoding='utf-8') as f:
+        old = {(run['shape'], run['size']): run for run in json.load(f)['runs']}
+    with open(args.new, 'r', encoding='utf-8') as f:
+        new = json.load(f)['runs']
+
+    for run in new:
+        base = old.get((run['shape'], run['size']))
+        if base is None:
+            continue
+        ratios = '  '.join(f'{phase} x{run["time"][phase] / base["time"][phase]:.2f}' for phase in PHASES)
+        print(f'{run["shape"]:14s} size {run["size"]:7d}: {ratios}')
+
+
+def bench_incremental(args):
+    """
+    Time IncrementalTranslation.edit against a full translate_str for small
+    edits at random places of a large program, checking both agree.
+    """
+
+    src = generate('mixed', args.lines)
+    print(f'source: {src.count(chr(10))} lines, {len(src) / 1e6:.2f} MB')
+    start = time.perf_counter()
+    inc = IncrementalTranslation(src)
+    print(f'initial translation: {(time.perf_counter() - start) * 1000:.1f} ms')
+
+    r = random.Random(0)
+    snippets = ('System.out.println("edited");\n', 'x++;\n', '7', '')
+    edit_times = []
+    full_times = []
+    for _ in range(args.edits):
+        # insert before a statement or replace a character of a number literal
+        src = inc.source
+        pos = src.index(';\n', r.randrange(len(src) // 2)) + 2
+        text = r.choice(snippets)
+        end = pos
+        if text in ('7', ''):
+            pos = next((i for i in range(pos, len(src)) if src[i].isdigit()), pos)
+            end = pos + 1 if pos < len(src) and src[pos].isdigit() else pos
+            text = text or '3'
+
+        start = time.perf_counter()
+        out = inc.edit(pos, end, text)
+        edit_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        full = translate_str(inc.source)
+        full_times.append(time.perf_counter() - start)
+        if out != full:
+            raise AssertionError(f'incremental output differs after editing offset {pos}')
+
+    edit_times.sort()
+    full_times.sort()
+    print(f'{args.edits} edits: incremental median {edit_times[len(edit_times) // 2] * 1000:.2f} ms, '
+          f'max {edit_times[-1] * 1000:.2f} ms; full translation median {full_times[len(full_times) // 2] * 1000:.1f} ms')
+
+
+def bench_execute(args):
+    """
+    Time getting an executable code object for a program: the text emitter
+    followed by compile() of the generated source, against translate_to_code,
+    which compiles the lowered Python AST directly.
+    """
+
+    print(f'{"program":>22s} {"text+compile":>13s} {"(compile)":>10s} {"direct":>10s} {"speedup":>8s}')
+    programs = [('Input.java', input_style_source(1))]
+    programs += [(f'{args.shape} {size}', generate(args.shape, size)) for size in args.sizes]
+    for name, src in programs:
+        text, text_time = best_time(lambda: translate_str(src), args.repeat)
+        _, compile_time = best_time(lambda: compile(text, '<java>', 'exec'), args.repeat)
+        _, direct_time = best_time(lambda: translate_to_code(src), args.repeat)
+        total = text_time + compile_time
+        print(f'{name:>22s} {total * 1000:10.2f} ms {compile_time * 1000:7.2f} ms '
+              f'{direct_time * 1000:7.2f} ms {total / direct_time:7.2f}x')
+
+
+def legacy_range_args(stmt, assigned=None, types=None):
+    # emitter.range_args before loops with variable bounds and larger steps
+    # were converted: integer literals and a step of 1 only
+    init, cond, update = stmt.init, stmt.condition, stmt.update
+    if not (isinstance(init, Variable) and isinstance(cond, BinaryCondition) and
+            isinstance(update, VarUpdate) and init.value.isdigit() and cond.right.isdigit() and
+            cond.left == init.name and update.name == init.name and abs(update.delta) == 1):
+        return None
+    start, end = int(init.value), int(cond.right)
+    args = {('<', 1): (start, end), ('<=', 1): (start, end + 1), ('>', -1): (start, end, -1),
+            ('>=', -1): (start, end - 1, -1), ('==', 1): (start, start + 1),
+            ('!=', 1): (start, end)}.get((cond.operator, update.delta))
+    return args and tuple((None, arg) for arg in args)
+
+
+def loop_source(iterations):
+    # counting loops of the forms range() conversion now covers
+    return f"""public class Loops {{
+    public static void main(String[] args) {{
+        int n = {iterations};
+        int total = 0;
+        for (int i = 0; i < n; i++) {{
+            total++;
+        }}
+        for (int i = 0; i < n; i += 2) {{
+            total++;
+        }}
+        for (int i = n; i >= 1; i -= 3) {{
+            total--;
+        }}
+        for (int i = 0; i <= n; i = i + 4) {{
+            total++;
+        }}
+        System.out.println(total);
+    }}
+}}
+"""
+
+
+def bench_loops(args):
+    """
+    Run time of translated counting loops, emitted as while loops (the
+    legacy range() conversion) and as range() loops.
+    """
+
+    src = loop_source(args.iterations)
+    with mock.patch('emitter.range_args', legacy_range_args):
+        legacy = translate_str(src)
+    current = translate_str(src)
+    for name, code in (('while loops', legacy), ('range()', current)):
+        compiled = compile(code, '<java>', 'exec')
+        _, elapsed = best_time(lambda: exec(compiled, {'print': lambda *values: None}), args.repeat)
+        print(f'{name:>12s}: {elapsed * 1000:8.2f} ms')
+
+
+def constant_source(iterations):
+    # a loop testing flags and limits that never change, with debug code
+    return f"""public class Flags {{
+    public static void main(String[] args) {{
+        boolean debug = false;
+        boolean trace = false;
+        int limit = {iterations};
+        int level = 2;
+        int total = 0;
+        int i = 0;
+        while (i < limit) {{
+            if (debug || trace) {{
+                System.out.println(i);
+            }} else if (level > 1 && limit > 0) {{
+                total++;
+            }} else {{
+                total--;
+            }}
+            if (debug && level == 3) {{
+                System.out.println("trace");
+            }}
+            i++;
+        }}
+        while (debug) {{
+            System.out.println("unreachable");
+        }}
+        System.out.println(total);
+    }}
+}}
+"""
+
+
+def bench_optimize(args):
+    """
+    Size and run time of the generated code without and with the
+    constant folding pass (translate_str(..., optimize=True)).
+    """
+
+    src = constant_source(args.iterations)
+    for name, optimize in (('plain', False), ('optimized', True)):
+        code = translate_str(src, optimize=optimize)
+        compiled = compile(code, '<java>', 'exec')
+        _, elapsed = best_time(lambda: exec(compiled, {'print': lambda *values: None}), args.repeat)
+        print(f'{name:>10s}: {len(code):6d} bytes, {code.count(chr(10)):4d} lines, {elapsed * 1000:8.2f} ms')
+
+
+def while_source(iterations):
+    # nested while loops with counters, conditions and updates in the body
+    return f"""public class Counters {{
+    public static void main(String[] args) {{
+        int n = {iterations};
+        int rows = 10;
+        int evens = 0;
+        int odds = 0;
+        int r = 0;
+        while (r < rows) {{
+            int i = 0;
+            boolean even = true;
+            while (i < n) {{
+                if (even) {{
+                    evens++;
+                    even = false;
+                }} else {{
+                    odds++;
+                    even = true;
+                }}
+                i++;
+            }}
+            r++;
+        }}
+        System.out.println(evens);
+        System.out.println(odds);
+    }}
+}}
+"""
+
+
+def bench_function(args):
+    """
+    Run time of loop-heavy translated programs with their variables as
+    module globals and as locals of main() (main_function=True).
+    """
+
+    programs = [('for loops', loop_source(args.iterations)),
+                ('while loops', while_source(args.iterations // 10)),
+                ('conditions', constant_source(args.iterations))]
+    for name, src in programs:
+        times = []
+        for main_function in (False, True):
+            compiled = compile(translate_str(src, main_function=main_function), '<java>', 'exec')
+            namespace = {'__name__': '__main__', 'print': lambda *values: None}
+            _, elapsed = best_time(lambda: exec(compiled, dict(namespace)), args.repeat)
+            times.append(elapsed)
+        print(f'{name:>12s}: module {times[0] * 1000:8.2f} ms  main() {times[1] * 1000:8.2f} ms  '
+              f'speedup {times[0] / times[1]:5.2f}x')
+
+
+def print_source(lines):
+    return f"""public class Prints {{
+    public static void main(String[] args) {{
+        for (int i = 0; i < {lines}; i++) {{
+            System.out.print("line ");
+            System.out.println(i);
+        }}
+    }}
+}}
+"""
+
+
+def bench_prints(args):
+    """
+    Run time of a translated program printing many lines, with print()
+    calls and with buffered prints, run as a separate process writing to
+    /dev/null and to a pipe.
+    """
+
+    src = print_source(args.lines)
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, buffered in (('print()', False), ('buffered', True)):
+            path = os.path.join(tmp, f'{name.strip("()")}.py')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(translate_str(src, buffered=buffered))
+            times = []
+            for target in (subprocess.DEVNULL, subprocess.PIPE):
+                _, elapsed = best_time(lambda: subprocess.run([sys.executable, path], stdout=target, check=True),
+                                       args.repeat)
+                times.append(elapsed)
+            print(f'{name:>10s}: /dev/null {times[0]:6.2f} s   pipe {times[1]:6.2f} s')
+
+
+def import_times(command, env):
+    """
+    Run command under python -X importtime. Returns the cumulative import
+    time of main in microseconds and (self time, module) pairs, slowest first.
+    """
+
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + command[1:], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    self_times = []
+    total = 0
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | module, nested imports indented
+        fields = line.split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        module = fields[2].strip()
+        self_times.append((int(fields[0].split(':')[1]), module))
+        if module == 'main':
+            total = int(fields[1])
+    self_times.sort(reverse=True)
+    return total, self_times
+
+
+def bench_startup(args):
+    """
+    Cold start of a small translation in fresh interpreters: wall time of
+    j2p.py and main.py next to an empty interpreter, and the import time of
+    the translator modules from python -X importtime. Exits with status 1
+    if the median import time is over --import-budget; the cold start of
+    j2p.py is reported against --target.
+    """
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    java = os.path.join(here, 'Input.java')
+    # measured with cached bytecode, as an installed translator runs
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    commands = {
+        'python -c pass': [sys.executable, '-c', 'pass'],
+        'j2p.py': [sys.executable, os.path.join(here, 'j2p.py'), java, '--dry-run'],
+        'main.py': [sys.executable, os.path.join(here, 'main.py'), java, '--dry-run'],
+    }
+    for command in commands.values():
+        subprocess.run(command, env=env, stdout=subprocess.DEVNULL, check=True) # writes the bytecode caches
+
+    times = {name: [] for name in commands}
+    imports = []
+    for _ in range(args.runs):
+        # interleaved, so changes in machine load hit every command alike
+        for name, command in commands.items():
+            start = time.perf_counter()
+            subprocess.run(command, env=env, stdout=subprocess.DEVNULL, check=True)
+            times[name].append(time.perf_counter() - start)
+        imports.append(import_times(commands['j2p.py'], env))
+    for name, samples in times.items():
+        samples.sort()
+        print(f'{name:>16s}: median {samples[len(samples) // 2] * 1000:6.1f} ms  min {samples[0] * 1000:6.1f} ms')
+
+    imports.sort(key=lambda result: result[0])
+    total, self_times = imports[len(imports) // 2]
+    print(f'imports of main: median {total / 1000:.1f} ms; slowest modules: ' +
+          ', '.join(f'{module} {us / 1000:.1f}' for us, module in self_times[:5]))
+
+    cold_start = times['j2p.py'][len(times['j2p.py']) // 2] * 1000
+    print(f'cold start {cold_start:.1f} ms (target {args.target:.0f} ms), '
+          f'imports {total / 1000:.1f} ms (budget {args.import_budget:.0f} ms): '
+          f'{"OVER BUDGET" if total / 1000 > args.import_budget else "ok"}')
+    if total / 1000 > args.import_budget:
+        sys.exit(1)
+
+
+# run in a child process: translate argv[1:] with main() and report the peak RSS in KiB
+PEAK_RSS_SCRIPT = '''
+import resource, sys
+from main import main
+main(sys.argv[1:])
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, file=sys.stderr)
+'''
+
+
+def bench_mmap(args):
+    """
+    Peak RSS and wall time of translating one very large file to /dev/null,
+    read into a string and memory-mapped (--mmap), each in a fresh process.
+    """
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    chunk = input_style_source(100)
+    with tempfile.TemporaryDirectory() as tmp:
+        java = os.path.join(tmp, 'Large.java')
+        with open(java, 'w', encoding='utf-8') as f:
+            for _ in range(max(1, args.mb * 1024 * 1024 // len(chunk))):
+                f.write(chunk)
+        size = os.path.getsize(java) / (1024 * 1024)
+        print(f'input: {size:.0f} MB')
+        for name, options in (('read()', []), ('--mmap', ['--mmap'])):
+            start = time.perf_counter()
+            result = subprocess.run([sys.executable, '-c', PEAK_RSS_SCRIPT, java, os.devnull] + options,
+                                    cwd=here, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                    text=True, check=True)
+            elapsed = time.perf_counter() - start
+            peak = int(result.stderr.split()[-1]) / 1024
+            print(f'{name:>8s}: peak RSS {peak:7.1f} MB ({peak / size:4.2f}x input)  {elapsed:6.2f} s')
+
+
+def bench_parallel(args):
+    """
+    Lexing and full translation time of one large source, serially and with
+    each number of worker processes (--parallel), checking that the tokens
+    and the generated code are the same.
+    """
+
+    import io
+    from parallel import lex_buffer_parallel, translate_parallel
+    from main import translate_to
+    chunk = input_style_source(100)
+    src = chunk * max(1, args.mb * 1024 * 1024 // len(chunk))
+    print(f'input: {len(src) / (1024 * 1024):.0f} MB, {os.cpu_count()} CPUs')
+    serial, lex_base = best_time(lambda: lex_java_buffer(src), args.repeat)
+
+    def translate_serial():
+        out = io.StringIO()
+        translate_to(src, out)
+        return out.getvalue()
+
+    code, base = best_time(translate_serial, args.repeat)
+    print(f'{"serial":>8s}: lex {lex_base:6.2f} s  translate {base:6.2f} s  ({len(serial)} tokens)')
+    for jobs in args.jobs:
+        (buf, error), lex_time = best_time(lambda: lex_buffer_parallel(src, jobs), args.repeat)
+        same_tokens = (error is None and buf.kinds == serial.kinds and buf.starts == serial.starts and
+                       buf.ends == serial.ends)
+        parallel_code, elapsed = best_time(lambda: translate_parallel(src, jobs), args.repeat)
+        print(f'{jobs:>3d} jobs: lex {lex_time:6.2f} s ({lex_base / lex_time:5.2f}x)  '
+              f'translate {elapsed:6.2f} s ({base / elapsed:5.2f}x)  '
+              f'{"same tokens" if same_tokens else "TOKENS DIFFER"}, '
+              f'{"same code" if parallel_code == code else "CODE DIFFERS"}')
+
+
+async def _load(args, sources):
+    """
+    Closed-loop load: each connection sends its next request as soon as the
+    previous response arrives. Returns (latencies in seconds, elapsed).
+    """
+
+    latencies = []
+    next_request = iter(range(args.requests))
+
+    async def worker():
+        if args.socket:
+            reader, writer = await asyncio.open_unix_connection(args.socket, limit=2 ** 31 - 1)
+        else:
+            reader, writer = await asyncio.open_connection(args.host, args.port, limit=2 ** 31 - 1)
+        for n in next_request:
+            payload = {'id': n, 'op': 'translate', 'source': sources[n % len(sources)]}
+            start = time.perf_counter()
+            writer.write(json.dumps(payload).encode('utf-8') + b'\n')
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            latencies.append(time.perf_counter() - start)
+            if not response['ok']:
+                raise RuntimeError(f'request {n} failed: {response["error"]}')
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.connections)))
+    return latencies, time.perf_counter() - start
+
+
+def bench_daemon(args):
+    """
+    Load-test a running translation server (or one started with --spawn)
+    and report requests/s and latency percentiles.
+    """
+
+    # a trailing comment makes every request unique, so the server's cache
+    # cannot answer it, unless --repeat-sources is given
+    base = input_style_source(args.copies)
+    count = 1 if args.repeat_sources else args.requests
+    sources = [f'{base}// request {n}\n' for n in range(count)]
+
+    server = None
+    if args.spawn:
+        args.socket = os.path.join(tempfile.mkdtemp(), 'translate.sock')
+        command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py'),
+                   '--socket', args.socket]
+        if args.workers is not None:
+            command += ['--workers', str(args.workers)]
+        server = subprocess.Popen(command, stderr=subprocess.PIPE)
+        server.stderr.readline() # "listening on ..." once the socket is ready
+    try:
+        latencies, elapsed = asyncio.run(_load(args, sources))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latencies.sort()
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    print(f'{len(latencies)} requests over {args.connections} connections in {elapsed:.2f}s: '
+          f'{len(latencies) / elapsed:.1f} req/s')
+    print(f'latency p50 {percentile(0.50):.2f} ms  p90 {percentile(0.90):.2f} ms  '
+          f'p99 {percentile(0.99):.2f} ms  max {latencies[-1] * 1000:.2f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Translator benchmarks')
+    sub = parser.add_subparsers(dest='benchmark', required=True)
+    
+    p = sub.add_parser('memory', help='bytes per token of each token representation')
+    p.add_argument('--copies', type=int, default=200, help='copies of the Input.java body (default: %(default)s)')
+    p.set_defaults(run=bench_memory)
+    
+    p = sub.add_parser('emit', help='emission time per output line for nested blocks')
+    p.add_argument('--depths', type=int, nargs='+', default=[1, 5, 10, 20, 40], help='nesting depths to time')
+    p.add_argument('--statements', type=int, default=20000, help='approximate statements per program (default: %(default)s)')
+    p.add_argument('--repeat', type=int, default=3, help='emissions to average over (default: %(default)s)')
+    p.set_defaults(run=bench_emit)
+    
+    p = sub.add_parser('intern', help='parse/emit time and AST memory with shared nodes and memoized emission')
+    p.add_argument('--copies', type=int, default=2000, help='size of the programs (default: %(default)s)')
+    p.add_argument('--repeat', type=int, default=3, help='timed runs, the fastest is reported')
+    p.set_defaults(run=bench_intern)
+    
+    p = sub.add_parser('pipeline', help='per-phase time and memory on synthetic programs')
+    p.add_argument('--shapes', nargs='+', default=['all'], choices=['all'] + sorted(SHAPES), help='program shapes (default: all)')
+    p.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000], help='statements per program')
+    p.add_argument('--repeat', type=int, default=3, help='timed runs per phase, the fastest is kept (default: %(default)s)')
+    p.add_argument('--json', help='write the results to this JSON file')
+    p.set_defaults(run=bench_pipeline)
+    
+    p = sub.add_parser('compare', help='compare two pipeline JSON result files')
+    p.add_argument('old', help='results of the baseline')
+    p.add_argument('new', help='results to compare against the baseline')
+    p.set_defaults(run=bench_compare)
+    
+    p = sub.add_parser('incremental', help='incremental re-translation after small edits')
+    p.add_argument('--lines', type=int, default=10000, help='approximate size of the edited program (default: %(default)s)')
+    p.add_argument('--edits', type=int, default=50, help='number of edits (default: %(default)s)')
+    p.set_defaults(run=bench_incremental)
+    
+    p = sub.add_parser('execute', help='time to a code object: text + compile() vs. lowered AST')
+    p.add_argument('--shape', choices=sorted(SHAPES), default='mixed', help='program shape (default: %(default)s)')
+    p.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000], help='statements per program')
+    p.add_argument('--repeat', type=int, default=5, help='timed runs, the fastest is reported')
+    p.set_defaults(run=bench_execute)
+    
+    p = sub.add_parser('loops', help='run time of translated counting loops, while vs. range()')
+    p.add_argument('--iterations', type=int, default=100000, help='loop bound (default: %(default)s)')
+    p.add_argument('--repeat', type=int, default=5, help='timed runs, the fastest is reported')
+    p.set_defaults(run=bench_loops)
+    
+    p = sub.add_parser('optimize', help='generated code size and run time with and without constant folding')
+    p.add_argument('--iterations', type=int, default=100000, help='loop bound (default: %(default)s)')
+    p.add_argument('--repeat', type=int, default=5, help='timed runs, the fastest is reported')
+    p.set_defaults(run=bench_optimize)
+    
+    p = sub.add_parser('prints', help='run time of a print-heavy program, print() vs. buffered prints')
+    p.add_argument('--lines', type=int, default=1000000, help='lines printed (default: %(default)s)')
+    p.add_argument('--repeat', type=int, default=3, help='timed runs, the fastest is reported')
+    p.set_defaults(run=bench_prints)
+    
+    p = sub.add_parser('function', help='run time of loop-heavy programs, module globals vs. main() locals')
+    p.add_argument('--iterations', type=int, default=100000, help='loop bound (default: %(default)s)')
+    p.add_argument('--repeat', type=int, default=5, help='timed runs, the fastest is reported')
+    p.set_defaults(run=bench_function)
+    
+    p = sub.add_parser('startup', help='cold start time of translating a small file, with a budget')
+    p.add_argument('--runs', type=int, default=20, help='runs of each command (default: %(default)s)')
+    p.add_argument('--target', type=float, default=30, help='cold start target for j2p.py in ms (default: %(default)s)')
+    p.add_argument('--import-budget', type=float, default=20,
+                   help='maximum import time of main and its imports in ms (default: %(default)s)')
+    p.set_defaults(run=bench_startup)
+    
+    p = sub.add_parser('mmap', help='peak memory of translating a very large file, read vs. memory-mapped')
+    p.add_argument('--mb', type=int, default=100, help='size of the generated input in MB (default: %(default)s)')
+    p.set_defaults(run=bench_mmap)
+    
+    p = sub.add_parser('parallel', help='lexing and translation time of one large file by number of worker processes')
+    p.add_argument('--mb', type=int, default=20, help='size of the generated source in MB (default: %(default)s)')
+    p.add_argument('--jobs', type=int, nargs='+', default=[1, 2, 4, 8],
+                   help='worker process counts to measure (default: %(default)s)')
+    p.add_argument('--repeat', type=int, default=1, help='runs of each, fastest is reported (default: %(default)s)')
+    p.set_defaults(run=bench_parallel)
+    
+    p = sub.add_parser('daemon', help='load test of the translation server')
+    p.add_argument('--host', default='127.0.0.1', help='server address (default: %(default)s)')
+    p.add_argument('--port', type=int, default=8765, help='server port (default: %(default)s)')
+    p.add_argument('--socket', help='connect to this Unix socket instead of TCP')
+    p.add_argument('--spawn', action='store_true', help='start a server on a temporary Unix socket for the test')
+    p.add_argument('--workers', type=int, default=None, help='worker processes of the spawned server')
+    p.add_argument('--connections', type=int, default=16, help='concurrent connections (default: %(default)s)')
+    p.add_argument('--requests', type=int, default=1000, help='total requests (default: %(default)s)')
+    p.add_argument('--copies', type=int, default=1, help='copies of Input.java per request (default: %(default)s)')
+    p.add_argument('--repeat-sources', action='store_true', help='send the same source every time (cache hits)')
+    p.set_defaults(run=bench_daemon)
+    
+    args = parser.parse_args()
+    args.run(args)
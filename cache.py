@@ -0,0 +1,176 @@
+"""
+Content-addressed on-disk cache of translations.
+Entries are keyed by a hash of the Java source plus a fingerprint of the
+translator modules, so changing the translator invalidates every entry.
+The cache is bounded in size and evicts least recently used entries.
+"""
+
+import os
+# hashlib and tempfile are imported where they are used: main.py imports
+# this module for DEFAULT_CACHE_SIZE on every run, cache or not
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# modules whose code determines the generated Python
+TRANSLATOR_MODULES = ('rules.py', 'lexer.py', 'parallel.py', 'parser.py', 'optimizer.py', 'emitter.py')
+
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024 # bytes
+# eviction trims the cache to this fraction of its maximum size, so the next
+# writes do not each walk the whole cache again
+LOW_WATER = 0.9
+
+
+def translator_fingerprint():
+    """
+    Hash of the translator sources, part of every cache key.
+    """
+
+    import hashlib
+    h = hashlib.sha256()
+    for name in TRANSLATOR_MODULES:
+        with open(os.path.join(HERE, name), 'rb') as f:
+            h.update(name.encode('utf-8') + b'\0' + f.read() + b'\0')
+    return h.hexdigest()
+
+
+def cache_variant(optimize=False, buffered=False, main_function=False):
+    """
+    The TranslationCache variant for the translation options that change the
+    generated code (main.translate_str optimize, buffered and main_function).
+    """
+
+    return ('optimized' if optimize else '') + ('buffered' if buffered else '') + ('main' if main_function else '')
+
+
+class TranslationCache:
+    """
+    Maps Java source text to translated Python source, stored as files under
+    cache_dir/<2 hex digits>/<key>.py.
+    File modification times record the last use and drive LRU eviction.
+    Writes go to a temporary file that is renamed into place, so readers
+    (including other processes) never see partial entries.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_SIZE, variant=''):
+        # variant names translation options that change the output, so
+        # translations made with different options get different keys
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.variant = variant
+        self.fingerprint = translator_fingerprint() + variant
+        self.hits = 0
+        self.misses = 0
+        self._size = None # total bytes on disk, computed on first write
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, java_src):
+        import hashlib
+        h = hashlib.sha256(self.fingerprint.encode('ascii'))
+        # a bytes source (see main.map_file) is already UTF-8, str and bytes share entries
+        h.update(java_src.encode('utf-8') if isinstance(java_src, str) else java_src)
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.py')
+
+    def get(self, java_src):
+        """
+        Return the cached translation of java_src, or None.
+        """
+
+        path = self._path(self.key(java_src))
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                py_code = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path) # mark as recently used
+        except OSError:
+            pass # evicted by another process meanwhile
+        self.hits += 1
+        return py_code
+
+    def put(self, java_src, py_code):
+        """
+        Store the translation of java_src atomically, then evict if over size.
+        """
+
+        path = self._path(self.key(java_src))
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        data = py_code.encode('utf-8')
+        try:
+            replaced = os.stat(path).st_size # the entry this write replaces
+        except FileNotFoundError:
+            replaced = 0
+        import tempfile
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._entries())
+        else:
+            self._size += len(data) - replaced
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def translate(self, java_src, translate):
+        """
+        Return the cached translation of java_src, calling translate(java_src)
+        and caching the result on a miss.
+        """
+
+        py_code = self.get(java_src)
+        if py_code is None:
+            py_code = translate(java_src)
+            self.put(java_src, py_code)
+        return py_code
+
+    def _entries(self):
+        # (path, size, last use) of every entry on disk
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if not name.endswith('.py'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, st.st_size, st.st_mtime))
+        return entries
+
+    def evict(self):
+        """
+        Delete least recently used entries until the cache is down to
+        LOW_WATER of max_bytes.
+        """
+
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * LOW_WATER)
+        entries.sort(key=lambda entry: entry[2]) # oldest first
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+        self._size = total
+
+    def stats(self):
+        return f'cache: {self.hits} hits, {self.misses} misses'
@@ -0,0 +1,118 @@
+"""
+Thin command-line client for the translation daemon (server.py).
+Takes the arguments of main.py for translating one file (output, --dry-run,
+-O, --buffer-prints, --main-function, --lexer) and behaves the same way, but
+sends the translation to a running server instead of translating in-process.
+"""
+
+import argparse
+import json
+import socket
+import sys
+
+DEFAULT_HOST = '127.0.0.1' # same defaults as server.py, which is not imported
+DEFAULT_PORT = 8765        # here to keep client startup cheap
+
+
+def connect(host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    if socket_path:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(socket_path)
+    else:
+        sock = socket.create_connection((host, port))
+    return sock
+
+
+def request(sock, payload):
+    """
+    Send one request over a connected socket and return the decoded response.
+    """
+
+    sock.sendall(json.dumps(payload).encode('utf-8') + b'\n')
+    reader = sock.makefile('rb')
+    line = reader.readline()
+    if not line:
+        raise ConnectionError('Server closed the connection')
+    return json.loads(line)
+
+
+def translate(java_src, lexer=None, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None,
+              optimize=False, buffered=False, main_function=False):
+    """
+    Translate java_src on the server. Returns the response dict.
+    optimize, buffered and main_function are the options of main.translate_str.
+    """
+
+    payload = {'id': 1, 'op': 'translate', 'source': java_src}
+    if lexer:
+        payload['lexer'] = lexer
+    # only options that are set are sent, the server defaults the rest to false
+    for field, value in (('optimize', optimize), ('buffer_prints', buffered), ('main_function', main_function)):
+        if value:
+            payload[field] = True
+    with connect(host, port, socket_path) as sock:
+        return request(sock, payload)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Translate Java code to Python using a running translation server'
+    )
+    parser.add_argument('input', help='Path to the input Java source file.')
+    parser.add_argument('output', nargs='?', help='Path to the output Python file. If omitted, prints to stdout.')
+    parser.add_argument('--dry-run', action='store_true', help='Print translated code instead of writing to a file.')
+    parser.add_argument('-O', '--optimize', action='store_true',
+                        help='Fold constant conditions and remove unreachable branches and loops.')
+    parser.add_argument('--buffer-prints', action='store_true',
+                        help='Make the generated program collect printed lines and write them in blocks.')
+    parser.add_argument('--main-function', action='store_true',
+                        help="Put the generated program in a main() function run under if __name__ == '__main__', "
+                             'so its variables are fast locals.')
+    parser.add_argument('--lexer', default=None, help='Lexer engine to use on the server.')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='Server address (default: %(default)s).')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Server port (default: %(default)s).')
+    parser.add_argument('--socket', help='Connect to this Unix socket instead of TCP.')
+    args = parser.parse_args()
+
+    try:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            java_src = f.read()
+    except FileNotFoundError:
+        print(f"Error: Input file '{args.input}' not found.", file=sys.stderr)
+        sys.exit(1)
+    except PermissionError:
+        print(f"Error: Permission denied reading '{args.input}'.", file=sys.stderr)
+        sys.exit(1)
+    except IOError as e:
+        print(f"Error reading '{args.input}': {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        response = translate(java_src, args.lexer, args.host, args.port, args.socket, args.optimize,
+                             args.buffer_prints, args.main_function)
+    except (OSError, ValueError) as e:
+        print(f"Error: cannot reach translation server: {e}", file=sys.stderr)
+        sys.exit(3)
+
+    if not response['ok']:
+        error = response['error']
+        if error['type'] == 'syntax':
+            print(f"Syntax error in Java code ({args.input}): {error['message']}", file=sys.stderr)
+        else:
+            print(f"Translation error: {error['message']}", file=sys.stderr)
+        sys.exit(2)
+
+    py_code = response['output']
+    if args.dry_run or args.output is None:
+        print(py_code)
+    else:
+        try:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(py_code)
+            print(f"Successfully translated '{args.input}' to '{args.output}'")
+        except PermissionError:
+            print(f"Error: Permission denied writing to '{args.output}'.", file=sys.stderr)
+            sys.exit(1)
+        except IOError as e:
+            print(f"Error writing to '{args.output}': {e}", file=sys.stderr)
+            sys.exit(1)
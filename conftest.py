@@ -0,0 +1,3 @@
+# test_tokens.py is a script that dumps the tokens of the file given on the
+# command line (python test_tokens.py Input.java), not a test module
+collect_ignore = ['test_tokens.py']
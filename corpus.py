@@ -0,0 +1,185 @@
+"""
+Synthetic Java program generator for benchmarks.
+Generates programs of a given shape and size using only the constructs the
+parser accepts. Run directly to write a program to stdout:
+    python corpus.py prints 10000 > Prints.java
+"""
+
+import os
+import random
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+TYPES = (
+    ('int', lambda r: str(r.randint(0, 1000))),
+    ('String', lambda r: f'"text {r.randint(0, 99)}"'),
+    ('char', lambda r: f"'{r.choice('abcxyz')}'"),
+    ('float', lambda r: f'{r.randint(0, 99)}.{r.randint(0, 99)}f'),
+    ('double', lambda r: f'{r.randint(0, 99)}.{r.randint(0, 999)}'),
+    ('boolean', lambda r: r.choice(('true', 'false'))),
+)
+COMPARISONS = ('==', '!=', '<', '>', '<=', '>=')
+
+
+def wrap(lines):
+    """
+    Put statement lines inside a class and main method.
+    """
+
+    body = ['        ' + line for line in lines]
+    return '\n'.join(['public class Main {',
+                      '    public static void main(String[] args) {'] +
+                     body + ['    }', '}']) + '\n'
+
+
+def declarations(size, r):
+    lines = []
+    for i in range(size):
+        type_name, value = TYPES[i % len(TYPES)]
+        lines.append(f'{type_name} v{i} = {value(r)};')
+    return lines
+
+
+def prints(size, r):
+    lines = ['int count = 0;']
+    for i in range(size):
+        if i % 3 == 0:
+            lines.append(f'System.out.println("line {i}");')
+        elif i % 3 == 1:
+            lines.append('System.out.println(count);')
+        else:
+            lines.append(f'System.out.print({r.randint(0, 9)});')
+    return lines
+
+
+def else_if_chains(size, r, branches=20):
+    # chains of `branches` else-if branches until size statements are reached
+    lines = ['int score = 50;']
+    count = 0
+    while count < size:
+        for b in range(branches):
+            keyword = 'if' if b == 0 else '} else if'
+            lines.append(f'{keyword} (score {r.choice(COMPARISONS)} {b * 5}) {{')
+            lines.append(f'    System.out.println("branch {b}");')
+            count += 2
+        lines.append('} else {')
+        lines.append('    score++;')
+        lines.append('}')
+        count += 1
+    return lines
+
+
+def nested_loops(size, r, depth=8):
+    # blocks nesting for/while/if `depth` levels deep
+    lines = ['int x = 0;', 'int y = 10;']
+    count = 0
+    while count < size:
+        for d in range(depth):
+            pad = '    ' * d
+            kind = d % 3
+            if kind == 0:
+                lines.append(f'{pad}for (int i{d} = 0; i{d} < 3; i{d}++) {{')
+            elif kind == 1:
+                lines.append(f'{pad}while (x < {d} && y > 0) {{')
+            else:
+                lines.append(f'{pad}if (x == {d}) {{')
+            lines.append(f'{pad}    System.out.println("level {d}");')
+            lines.append(f'{pad}    x++;')
+            count += 3
+        for d in reversed(range(depth)):
+            lines.append('    ' * d + '}')
+    return lines
+
+
+def long_conditions(size, r, terms=12):
+    # if/while statements whose conditions chain `terms` comparisons
+    lines = ['int a = 1;', 'int b = 2;', 'boolean flag = true;']
+    for i in range(max(1, size // 2)):
+        parts = []
+        for t in range(terms):
+            term = r.choice((f'a {r.choice(COMPARISONS)} {t}', 'flag', f'(b {r.choice(COMPARISONS)} a)'))
+            parts.append(term)
+            if t < terms - 1:
+                parts.append(r.choice(('&&', '||')))
+        keyword = 'if' if i % 2 == 0 else 'while'
+        lines.append(f'{keyword} ({" ".join(parts)}) {{')
+        lines.append('    a++;')
+        lines.append('}')
+    return lines
+
+
+def mixed(size, r):
+    lines = []
+    generators = (declarations, prints, else_if_chains, nested_loops, long_conditions)
+    chunk = max(10, size // 20)
+    count = 0
+    while count < size:
+        lines += r.choice(generators)(chunk, r)
+        count += chunk
+    return lines
+
+
+# name -> function(size, random) returning statement lines
+SHAPES = {
+    'declarations': declarations,
+    'prints': prints,
+    'else_if': else_if_chains,
+    'nested_loops': nested_loops,
+    'conditions': long_conditions,
+    'mixed': mixed,
+}
+
+
+def generate(shape, size, seed=0):
+    """
+    Return a Java program of the given shape with about size statements.
+    The same shape, size and seed always give the same program.
+    """
+
+    if shape not in SHAPES:
+        raise ValueError(f'Unknown shape {shape!r}, expected one of {sorted(SHAPES)}')
+    return wrap(SHAPES[shape](size, random.Random(seed)))
+
+
+def input_style_source(copies):
+    """
+    Build a large Java program by repeating the body of main in Input.java.
+    """
+    with open(os.path.join(HERE, 'Input.java'), 'r', encoding='utf-8') as f:
+        lines = f.read().rstrip().split('\n')
+    # keep the class and main declarations once, repeat everything inside main
+    header, body, footer = lines[:2], lines[2:-2], lines[-2:]
+    return '\n'.join(header + body * copies + footer) + '\n'
+
+
+def nested_source(depth, copies):
+    """
+    Build a Java program of copies blocks, each nesting for/while/if
+    statements depth levels deep with a few statements at every level.
+    """
+
+    lines = []
+    for c in range(copies):
+        for d in range(depth):
+            pad = '    ' * d
+            kind = d % 3
+            if kind == 0:
+                lines.append(f'{pad}for (int i{d} = 0; i{d} < 3; i{d}++) {{')
+            elif kind == 1:
+                lines.append(f'{pad}while (x < {d} && y > {c}) {{')
+            else:
+                lines.append(f'{pad}if (x == {d}) {{')
+            lines.append(f'{pad}    System.out.println("level {d}");')
+            lines.append(f'{pad}    x++;')
+        for d in reversed(range(depth)):
+            lines.append('    ' * d + '}')
+    return '\n'.join(lines) + '\n'
+
+
+if __name__ == '__main__':
+    if len(sys.argv) not in (3, 4) or sys.argv[1] not in SHAPES:
+        print(f'usage: python corpus.py {{{",".join(SHAPES)}}} SIZE [SEED]', file=sys.stderr)
+        sys.exit(1)
+    seed = int(sys.argv[3]) if len(sys.argv) == 4 else 0
+    sys.stdout.write(generate(sys.argv[1], int(sys.argv[2]), seed))
@@ -9,60 +9,285 @@ from parser import (
 )
 
 INDENT = '    '
+FLUSH_SIZE = 64 * 1024 # characters written between explicit flushes of an output stream
 
-def indent_lines(text, level=1):
+# buffered print output (buffered=True): prints append to a list that is
+# written to sys.stdout in blocks of PRINT_BUFFER_LINES, at the end of the
+# program and, if it stops early, at exit
+PRINT_BUFFER_LINES = 4096
+PRINT_BUFFER_PRELUDE = (
+    'import atexit as _atexit',
+    'import sys as _sys',
+    '_print_buffer = []',
+    '_print_write = _print_buffer.append',
+    'def _print_flush():',
+    f"{INDENT}_sys.stdout.write(''.join(_print_buffer))",
+    f'{INDENT}_print_buffer.clear()',
+    '_atexit.register(_print_flush)',
+)
+PRINT_BUFFER_CHECK = f'if len(_print_buffer) >= {PRINT_BUFFER_LINES}: _print_flush()'
+PRINT_BUFFER_EPILOGUE = ('_print_flush()',)
+
+# main_function=True: the program becomes the body of a main() function, as
+# in the Java main method that rules.MAIN_DECL skips, so its variables are
+# fast locals instead of module globals
+MAIN_FUNCTION_HEADER = 'def main():'
+MAIN_FUNCTION_GUARD = ("if __name__ == '__main__':", f'{INDENT}main()')
+
+# memoize=True: code of shared nodes (see parser.Interner) is formatted once
+EMIT_MEMO_SIZE = 1 << 14 # entries kept, the memo is cleared when full
+
+class CodeWriter:
     """
-    Add indentation to each non_empty line of text.
+    Accumulates generated Python lines in a single list.
+    Carries the current indentation level, so every line is written once,
+    already indented, instead of re-indenting nested blocks as strings.
     """
     
-    lines = text.split('\n')
-    indented = []
-    for line in lines:
-        if line.strip():
-            # only indent non-empty lines
-            indented.append(INDENT * level + line)
-        else:
-            # keep empty lines empty
-            indented.append(line)
-    return '\n'.join(indented)
+    def __init__(self):
+        self.parts = []
+        self.level = 0
+        self.prefix = '' # INDENT * level, kept up to date
+    
+    def line(self, text, pos=None):
+        # pos is the Java source offset the line comes from, see MappingWriter
+        self.parts.append(f'{self.prefix}{text}\n')
+    
+    def indent(self):
+        self.level += 1
+        self.prefix = INDENT * self.level
+    
+    def dedent(self):
+        self.level -= 1
+        self.prefix = INDENT * self.level
+    
+    def unmapped(self):
+        # the following lines come from no Java code, see MappingWriter
+        pass
+    
+    def getvalue(self):
+        return ''.join(self.parts)
 
-def emit_module(mod):
+class MappingWriter(CodeWriter):
+    """
+    CodeWriter that also fills a sourcemap.SourceMap as lines are written,
+    so the map costs no second traversal of the AST or the output.
+    Lines written without a position continue the previous segment, up to
+    a call of unmapped.
+    """
+    
+    def __init__(self, source_map):
+        super().__init__()
+        self.source_map = source_map
+        self.line_count = 0 # lines written so far, including flushed ones
+        self.last_pos = None
+    
+    def line(self, text, pos=None):
+        self.parts.append(f'{self.prefix}{text}\n')
+        self.line_count += 1
+        if pos is not None and pos != self.last_pos:
+            self.last_pos = pos
+            self.source_map.record(self.line_count, pos)
+    
+    def unmapped(self):
+        self.last_pos = None
+        self.source_map.add_unmapped(self.line_count + 1)
+
+def make_writer(source_map=None):
+    return CodeWriter() if source_map is None else MappingWriter(source_map)
+
+class EmitMemo:
+    """
+    Bounded memo of the code emitted for AST nodes, for trees of shared
+    nodes built by parse_module(..., intern=True): a statement or condition
+    that occurs many times is formatted once.
+    Keys are id(condition) for the text of a condition and (id(statement),
+    indentation level) for the lines of a statement, which are only kept once
+    the statement is met a second time; joining the lines of every statement
+    would copy deeply nested code once per level. An entry holds its node, so
+    the id cannot be reused by another node while the entry exists.
+    The code of a statement depends on the buffered option of write_stmt, so
+    a memo serves one value of it, and on the declared types of write_stmt,
+    so it is invalidated when they change.
+    """
+    __slots__ = ('entries', 'size', 'generation')
+    
+    def __init__(self, size=EMIT_MEMO_SIZE):
+        self.entries = {} # key -> (node, code), code None for a statement met once
+        self.size = size
+        self.generation = 0 # counts invalidate() calls
+    
+    def invalidate(self):
+        # the declared types changed, and with them the code of for loops
+        self.entries.clear()
+        self.generation += 1
+    
+    def put(self, key, node, code):
+        if len(self.entries) >= self.size:
+            self.entries.clear()
+        self.entries[key] = (node, code)
+
+def make_memo(memoize, source_map=None):
+    # memoized code is written as whole blocks of lines, which a MappingWriter
+    # cannot map, and shared nodes have no positions to map anyway
+    if not memoize:
+        return None
+    if source_map is not None:
+        raise ValueError('Memoized emission cannot fill a source map')
+    return EmitMemo()
+
+def write_prelude(w, buffered=False, main_function=False):
+    """
+    Write the code that goes before the first statement and leave w at the
+    indentation of the statements.
+    """
+    
+    if buffered:
+        for text in PRINT_BUFFER_PRELUDE:
+            w.line(text)
+    if main_function:
+        w.line(MAIN_FUNCTION_HEADER)
+        w.indent()
+
+def write_epilogue(w, buffered=False, main_function=False, empty=False):
+    """
+    Write the code that goes after the last statement; empty tells that no
+    statement was written.
+    """
+    
+    if main_function or buffered:
+        w.unmapped() # not part of the last statement
+    if main_function:
+        if empty:
+            w.line('pass')
+        w.dedent()
+        w.line('')
+        for text in MAIN_FUNCTION_GUARD:
+            w.line(text)
+        w.indent() # the print buffer is flushed once main() returns
+    if buffered:
+        for text in PRINT_BUFFER_EPILOGUE:
+            w.line(text)
+    if main_function:
+        w.dedent()
+
+def emit_module(mod, source_map=None, buffered=False, main_function=False, memoize=False):
     """
     Generate Python code from Module AST node.
+    If a SourceMap is given it is filled with the Java position of every
+    output line.
+    With buffered=True prints go through a buffer, see PRINT_BUFFER_PRELUDE.
+    With main_function=True the code is the body of a main() function called
+    under an if __name__ == '__main__' guard.
+    With memoize=True the code of repeated nodes is reused, see EmitMemo.
     """
     
-    lines = []
+    w = make_writer(source_map)
+    memo = make_memo(memoize, source_map)
+    types = {} # declared types, see write_stmt
+    write_prelude(w, buffered, main_function)
     for stmt in mod.body:
-        lines.append(emit_stmt(stmt))
-    return "".join(lines) 
+        write_stmt(w, stmt, buffered, memo, types)
+    write_epilogue(w, buffered, main_function, empty=not mod.body)
+    return w.getvalue()
+
+def emit_module_to(stream, mod, source_map=None, buffered=False, main_function=False, memoize=False):
+    """
+    Write Python code for a Module AST node to a text stream.
+    """
+    
+    emit_statements_to(stream, mod.body, source_map, buffered, main_function, memoize)
+
+def emit_statements_to(stream, stmts, source_map=None, buffered=False, main_function=False, memoize=False):
+    """
+    Write Python code for top-level statements to a text stream as they are
+    emitted, so only one statement's output is held in memory at a time.
+    stmts can be a generator, e.g. parser.iter_statements, to interleave
+    parsing and writing.
+    The stream is flushed after the first statement, for a short time to
+    first byte when piping, and then every FLUSH_SIZE characters.
+    source_map, buffered, main_function and memoize are as in emit_module.
+    """
+    
+    w = make_writer(source_map)
+    memo = make_memo(memoize, source_map)
+    types = {} # declared types, see write_stmt
+    write_prelude(w, buffered, main_function)
+    pending = 0 # characters written since the last flush
+    first = True
+    for stmt in stmts:
+        write_stmt(w, stmt, buffered, memo, types)
+        text = w.getvalue()
+        w.parts.clear()
+        stream.write(text)
+        pending += len(text)
+        if first or pending >= FLUSH_SIZE:
+            stream.flush()
+            pending = 0
+            first = False
+    write_epilogue(w, buffered, main_function, empty=first)
+    stream.write(w.getvalue())
+    w.parts.clear()
+    stream.flush()
 
-def emit_condition(cond):
+def emit_condition(cond, memo=None):
     """
     Generate Python code for conditional expressions.
     Handles both binary conditions and logical combinations.
-    Recursively processes nested conditions.
+    Nested conditions are walked with an explicit stack of pending nodes and
+    text fragments, so deep && / || chains need no recursion.
+    With an EmitMemo the text of a condition node is built once.
     """
     
-    if isinstance(cond, BinaryCondition):
-        if cond.operator:
-            return f'{cond.left} {cond.operator} {cond.right}'
-        else:
-            return f'{cond.left}'
-    
-    elif isinstance(cond, LogicalCondition):
-        py_op = 'and' if cond.operator == '&&' else 'or'  
-        # recursivity   
-        left_str = emit_condition(cond.left)
-        right_str = emit_condition(cond.right)
-        return f'({left_str}) {py_op} ({right_str})'
+    if memo is not None:
+        entry = memo.entries.get(id(cond))
+        if entry is None:
+            entry = (cond, emit_condition(cond))
+            memo.put(id(cond), *entry)
+        return entry[1]
     
-    # fallback for unexpected condition types
-    return str(cond)
+    parts = []
+    pending = [cond] # next item last
+    while pending:
+        item = pending.pop()
+        if isinstance(item, str):
+            parts.append(item)
+        
+        elif isinstance(item, BinaryCondition):
+            # literals as in assignments: true -> True, 1.5f -> 1.5
+            if item.operator:
+                parts.append(f'{emit_value(item.left)} {item.operator} {emit_value(item.right)}')
+            else:
+                parts.append(emit_value(item.left))
+        
+        elif isinstance(item, LogicalCondition):
+            py_op = 'and' if item.operator == '&&' else 'or'  
+            # a chain of the same operator is written flat, ({a}) {py_op} ({b}) {py_op} ({c}):
+            # nested parentheses would exceed the parser's nesting limit on long chains
+            operands = [item.left]
+            right = item.right
+            while isinstance(right, LogicalCondition) and right.operator == item.operator:
+                operands.append(right.left)
+                right = right.right
+            operands.append(right)
+            # pushed in reverse
+            pending.append(')')
+            for operand in reversed(operands[1:]):
+                pending.append(operand)
+                pending.append(f') {py_op} (')
+            pending.append(item.left)
+            pending.append('(')
+        
+        else:
+            # fallback for unexpected condition types
+            parts.append(str(item))
+    return ''.join(parts)
 
 def emit_value(val):
     """
     Convert Java literal values to Python equivalents.
-    Handles boolean and float suffixes.
+    Handles booleans and float suffixes (5f is 5.0); identifiers are returned unchanged,
+    also when they end with an f (buf, ref).
     """
     
     if not val:
@@ -72,153 +297,357 @@ def emit_value(val):
         return 'True'
     elif val == 'false':
         return 'False'
-    elif len(val) > 1 and val[-1] in ('f', 'F'):
-        return val[:-1]
+    elif val[-1] in ('f', 'F') and val[0].isdigit():
+        # a float literal (rules FLOAT_NUMBER), the only value starting with a digit;
+        # 5f stays a float, 5.0 as in lowering.lower_value
+        number = val[:-1]
+        return number if '.' in number else number + '.0'
     
     return val
 
-def emit_if(stmt):
+# markers in the work lists of write_stmt
+BLOCK_START = object() # indent one level
+BLOCK_END = object() # dedent one level
+STATEMENT_TYPES = (Print, Variable, IfStatement, WhileStatement, VarUpdate, ForStatement)
+
+class MemoRecord:
+    # marker after the work items of a statement whose code goes into an
+    # EmitMemo: the code is what the writer got from part start on, unless
+    # the memo was invalidated in between
+    __slots__ = ('key', 'node', 'start', 'generation')
+    
+    def __init__(self, key, node, start, generation):
+        self.key = key
+        self.node = node
+        self.start = start
+        self.generation = generation
+
+# the *_items functions describe the code of a compound statement as a list of
+# work items for write_stmt: (text, source offset) tuples are output lines,
+# AST nodes are nested statements, BLOCK_START/BLOCK_END change the indentation
+
+def block_items(body):
+    # statements of a block, one level deeper than the current line;
+    # Python needs at least one statement in a block, Java allows {}
+    return [BLOCK_START, *(body or [('pass', None)]), BLOCK_END]
+
+def if_items(stmt, memo=None):
     """
     Generate Python code for IfStatement AST node.
     Handles optional else branch.
+    else-if chains are written as elif.
+    memo is passed on to emit_condition.
     """
     
-    cond_str = emit_condition(stmt.condition)
-    result = f'if {cond_str}:\n'
+    items = []
+    keyword = 'if'
+    while True:
+        items.append((f'{keyword} {emit_condition(stmt.condition, memo)}:', stmt.pos))
+        items += block_items(stmt.body)
+        if not stmt.else_if:
+            break
+        keyword = 'elif'
+        stmt = stmt.else_if
     
-    body_lines = [emit_stmt(s) for s in stmt.body]
-    body_str = ''.join(body_lines)
-    result += indent_lines(body_str, level=1)
-    
-    if stmt.else_if:
-        elif_code = emit_stmt(stmt.else_if)
-        elif_code = elif_code.replace('if', 'elif', 1)
-        result += elif_code
-    elif stmt.else_body:
-        result += 'else:\n'
-        else_lines = [emit_stmt(s) for s in stmt.else_body]
-        else_str = ''.join(else_lines)
-        result += indent_lines(else_str, level=1)
-    return result
+    if stmt.else_body:
+        items.append(('else:', stmt.pos))
+        items += block_items(stmt.else_body)
+    return items
 
-def emit_while(stmt):
+def while_items(stmt, memo=None):
     """
     Generate Python code for while loop.
     """
     
-    cond_str = emit_condition(stmt.condition)
-    result = f'while {cond_str}:\n'
+    return [(f'while {emit_condition(stmt.condition, memo)}:', stmt.pos), *block_items(stmt.body)]
+
+def loop_assignments(root):
+    """
+    Map id() of every ForStatement in the statement root (root included) to
+    the set of variable names assigned anywhere in the loop's body.
+    Statements are visited once and children are done before their parents,
+    so the sets of nested loops are built up instead of re-walking each body.
+    """
     
-    body_lines = [emit_stmt(s) for s in stmt.body]
-    body_str = ''.join(body_lines)
-    result += indent_lines(body_str, level=1)
+    order = [] # statements, parents before children
+    pending = [root]
+    while pending:
+        node = pending.pop()
+        order.append(node)
+        if isinstance(node, (ForStatement, WhileStatement)):
+            pending += node.body
+        elif isinstance(node, IfStatement):
+            pending += node.body
+            if node.else_if:
+                pending.append(node.else_if)
+            elif node.else_body:
+                pending += node.else_body
     
-    return result
+    assigned = {} # id(statement) -> names it assigns, nested statements included
+    loops = {}
+    for node in reversed(order):
+        if isinstance(node, (Variable, VarUpdate)):
+            assigned[id(node)] = {node.name}
+            continue
+        if isinstance(node, IfStatement):
+            children = node.body + ([node.else_if] if node.else_if else node.else_body or [])
+        elif isinstance(node, (ForStatement, WhileStatement)):
+            children = node.body
+        else:
+            continue
+        names = set()
+        for child in children:
+            names |= assigned.get(id(child), names)
+        if isinstance(node, ForStatement):
+            loops[id(node)] = names
+            names = names | {part.name for part in (node.init, node.update) if part is not None}
+        assigned[id(node)] = names
+    return loops
 
-def is_simple_range_loop(stmt):
+def declare(types, name, hint):
     """
-    Determine if a ForStatement can be converted to Python's range() loop.
+    Record a declaration of name with the type_hint hint in types, which maps
+    every name declared so far to its type_hint, or to None once it has been
+    declared with different types. Returns True if the entry of the name
+    changed. The result does not depend on the order of the declarations.
+    """
+    
+    if not hint:
+        return False # for (i = 0; ...) assigns a variable declared elsewhere
+    known = types.get(name, '')
+    if known == hint or known is None:
+        return False
+    types[name] = hint if known == '' else None
+    return True
+
+def is_int_name(value, types):
+    # identifiers a range() bound or start can refer to: names only ever
+    # declared as int; range() rejects floats, and true and false are literals
+    return types.get(value) == 'int'
+
+def range_args(stmt, assigned=None, types=None):
+    """
+    Arguments of the range() call that replaces a ForStatement, or None if
+    the loop cannot be written as a range() loop.
+    Each argument is a (name, offset) pair standing for name + offset, with
+    name None for plain integers.
     
-    A simple range loop has:
-    - numeric initialization
-    - binary condition comparing loop variable to a number
-    - simple increment/decrement
+    A range loop has:
+    - an int loop variable, initialized from an integer literal or an int
+      variable
+    - a condition comparing the loop variable to an integer literal or to an
+      int variable other than the loop variable
+    - a constant step, counting towards the bound
+    - a body that assigns neither the loop variable nor the bound, which is
+      what lets range() evaluate both only once
+    A loop that assigns a variable declared before it, for (i = 0; ...), is
+    never converted: range() would leave the variable at its last value
+    rather than one step further, and the code after the loop may read it.
+    assigned is the set of names assigned in the body, see loop_assignments.
+    types maps names to their declared type, see declare; without it
+    variables are not known to be ints.
     """
     
-    return (
-        stmt.init and isinstance(stmt.init, Variable) and stmt.init.value.isdigit() and
-        stmt.condition and isinstance(stmt.condition, BinaryCondition) and
-        stmt.condition.left == stmt.init.name and stmt.condition.right.isdigit() and
-        stmt.update and isinstance(stmt.update, VarUpdate) and abs(stmt.update.delta) == 1
-    )
+    init, cond, update = stmt.init, stmt.condition, stmt.update
+    if not (isinstance(init, Variable) and isinstance(cond, BinaryCondition) and
+            isinstance(update, VarUpdate) and
+            cond.left == init.name and update.name == init.name and update.delta != 0):
+        return None
+    if init.type_hint not in ('int', ''):
+        return None # a float or double loop variable takes float values
+    if init.type_hint == '':
+        return None # the loop variable outlives the loop
+    var = init.name
+    if types is None:
+        types = {}
+    
+    if init.value.isdigit():
+        start = (None, int(init.value))
+    elif is_int_name(init.value, types):
+        start = (init.value, 0)
+    else:
+        return None
+    
+    literal = cond.right.isdigit()
+    if literal:
+        end = int(cond.right)
+    elif not is_int_name(cond.right, types) or cond.right == var:
+        return None
+    
+    if assigned is None:
+        assigned = loop_assignments(stmt)[id(stmt)]
+    if var in assigned or (not literal and cond.right in assigned):
+        return None
+    
+    def bound(offset):
+        # the condition's right side plus offset
+        return (None, end + offset) if literal else (cond.right, offset)
+    
+    op = cond.operator
+    step = update.delta
+    step_args = () if step == 1 else ((None, step),)
+    
+    if op == '<' and step > 0:
+        # for (i = 0; i < n; i += 2) → range(0, n, 2)
+        return (start, bound(0), *step_args)
+    elif op == '<=' and step > 0:
+        # for (i = 0; i <= 10; i++) → range(0, 11)
+        return (start, bound(1), *step_args)
+    elif op == '>' and step < 0:
+        # for (i = 10; i > 0; i--) → range(10, 0, -1)
+        return (start, bound(0), *step_args)
+    elif op == '>=' and step < 0:
+        # for (i = 10; i >= 0; i--) → range(10, -1, -1)
+        return (start, bound(-1), *step_args)
+    elif literal and start[0] is None and step == 1:
+        if op == '==':
+            # Edge case: for (i = 5; i == 5; i++) runs once
+            return start, (None, start[1] + 1)
+        elif op == '!=':
+            # for (i = 0; i != 10; i++) → range(0, 10)
+            return start, bound(0)
+    return None
+
+def format_bound(arg):
+    # Python expression for a (name, offset) range argument
+    name, offset = arg
+    if name is None:
+        return str(offset)
+    if offset == 0:
+        return name
+    return f'{name} + {offset}' if offset > 0 else f'{name} - {-offset}'
 
-def emit_for(stmt):
+def for_items(stmt, assigned=None, memo=None, types=None):
     """
     Generate Python code for for loop.
-    Attempts to convert simple counting loops to Python's range() syntax.
+    Attempts to convert counting loops to Python's range() syntax.
     Falls back to while loop for complex cases.
+    assigned and types are passed on to range_args, memo to emit_condition.
     """
     
-    if is_simple_range_loop(stmt):
-        start = int(stmt.init.value)
-        end = int(stmt.condition.right)
-        var_name = stmt.init.name
-        op = stmt.condition.operator
-        step = stmt.update.delta
-        
-        range_args = None
-        
-        if op == '<' and step == 1:
-            # for (i = 0; i < 10; i++) → range(0, 10)
-            range_args = f'{start}, {end}'
-        elif op == '<=' and step == 1:
-            # for (i = 0; i <= 10; i++) → range(0, 11)
-            range_args = f'{start}, {end + 1}'
-        elif op == '>' and step == -1:
-            # for (i = 10; i > 0; i--) → range(10, 0, -1)
-            range_args = f'{start}, {end}, -1'
-        elif op == '>=' and step == -1:
-            # for (i = 10; i >= 0; i--) → range(10, -1, -1)
-            range_args = f'{start}, {end - 1}, -1'
-        elif op == '==' and step == 1:
-            # Edge case: for (i = 5; i == 5; i++) runs once
-            range_args = f'{start}, {start + 1}'
-        elif op == '!=' and step == 1:
-            # for (i = 0; i != 10; i++) → range(0, 10)
-            range_args = f'{start}, {end}'
-            
-        if range_args:
-            result = f'for {var_name} in range({range_args}):\n'
-            
-            body_lines = [emit_stmt(s) for s in stmt.body]
-            body_str = ''.join(body_lines)
-            result += indent_lines(body_str, level=1)
-            
-            return result
+    args = range_args(stmt, assigned, types)
+    if args:
+        return [(f'for {stmt.init.name} in range({", ".join(map(format_bound, args))}):', stmt.pos),
+                *block_items(stmt.body)]
     
-    lines = [] 
     # fallback convert to while loop
+    items = []
     if stmt.init is not None:
-        lines.append(emit_stmt(stmt.init))
+        items.append(stmt.init)
         
-    cond_str = 'True' if stmt.condition is None else emit_condition(stmt.condition)
+    cond_str = 'True' if stmt.condition is None else emit_condition(stmt.condition, memo)
+    items.append((f'while {cond_str}:', stmt.pos))
     
-    body_lines = [emit_stmt(s) for s in stmt.body]
+    items.append(BLOCK_START)
+    items += stmt.body
     if stmt.update is not None:
-        body_lines.append(emit_stmt(stmt.update))
-    body_str = ''.join(body_lines)
-    
-    result = f'while {cond_str}:\n'
-    result += indent_lines(body_str, level=1)
-    
-    return ''.join(lines) + result
+        items.append(stmt.update)
+    items.append(BLOCK_END)
+    return items
+
+def print_text(stmt):
+    # Python code for a Print node
+    arg = emit_value(stmt.args[0])
+    return f'print({arg})' if stmt.newline else f"print({arg}, end='')"
 
-def emit_stmt(stmt):
+def buffered_print_text(stmt):
+    # Python code appending the output of a Print node to the print buffer
+    arg = emit_value(stmt.args[0])
+    if arg[:1] in ('"', "'"):
+        # a string literal: the newline is joined to it at compile time
+        text = f'{arg} "\\n"' if stmt.newline else arg
+    else:
+        text = f"f'{{{arg}}}\\n'" if stmt.newline else f'str({arg})'
+    return f'_print_write({text})'
+
+def write_stmt(w, stmt, buffered=False, memo=None, types=None):
     
     """
-    Generate Python code for a single statement.
+    Write Python code for a single statement.
     Dispatches to appropriate emitter based on statement type.
+    Nested statements are kept on an explicit work stack instead of
+    recursing, so nesting depth is only limited by memory.
+    With buffered=True prints are written to the print buffer, see
+    PRINT_BUFFER_PRELUDE.
+    With an EmitMemo the lines of a statement met before at the same
+    indentation are written again as they are; w must be a CodeWriter.
+    types maps names to their declared types (see declare) and is updated
+    with the declarations written; pass the same dict for the statements of
+    a module in order, since a for loop only becomes a range() loop with
+    bounds declared as int.
     """
-    if isinstance(stmt, Print):
-        return f'print({stmt.args[0]})\n' 
-    
-    elif isinstance(stmt, Variable):
-        val = emit_value(stmt.value)
-        return f'{stmt.name} = {val}\n'
-    
-    elif isinstance(stmt, IfStatement):
-        return emit_if(stmt)
+    pending = [stmt] # next item last
+    loops = {} # loop_assignments of the for loops met so far
+    if types is None:
+        types = {}
+    while pending:
+        item = pending.pop()
+        if memo is not None and isinstance(item, STATEMENT_TYPES):
+            key = (id(item), w.level)
+            entry = memo.entries.get(key)
+            if entry is None:
+                memo.put(key, item, None) # code is kept from the second time on
+            elif entry[1] is None:
+                pending.append(MemoRecord(key, item, len(w.parts), memo.generation)) # done after the statement's items
+            else:
+                w.parts.append(entry[1])
+                continue
         
-    elif isinstance(stmt, WhileStatement):
-        return emit_while(stmt)
-    
-    elif isinstance(stmt, VarUpdate):
-        if stmt.delta >= 0:
-            return f'{stmt.name} += {stmt.delta}\n'
-        else:
-            return f'{stmt.name} -= {abs(stmt.delta)}\n'
+        if isinstance(item, tuple):
+            w.line(*item)
+        
+        elif item is BLOCK_START:
+            w.indent()
         
-    elif isinstance(stmt, ForStatement):
-        return emit_for(stmt)
+        elif item is BLOCK_END:
+            w.dedent()
+        
+        elif isinstance(item, Print):
+            if buffered:
+                w.line(buffered_print_text(item), item.pos)
+                w.line(PRINT_BUFFER_CHECK)
+            else:
+                w.line(print_text(item), item.pos)
+        
+        elif isinstance(item, Variable):
+            if declare(types, item.name, item.type_hint) and memo is not None:
+                memo.invalidate()
+            val = emit_value(item.value)
+            w.line(f'{item.name} = {val}', item.pos)
+        
+        elif isinstance(item, MemoRecord):
+            if item.generation == memo.generation:
+                memo.put(item.key, item.node, ''.join(w.parts[item.start:]))
+        
+        elif isinstance(item, IfStatement):
+            pending += reversed(if_items(item, memo))
+            
+        elif isinstance(item, WhileStatement):
+            pending += reversed(while_items(item, memo))
+        
+        elif isinstance(item, VarUpdate):
+            if item.delta >= 0:
+                w.line(f'{item.name} += {item.delta}', item.pos)
+            else:
+                w.line(f'{item.name} -= {abs(item.delta)}', item.pos)
+            
+        elif isinstance(item, ForStatement):
+            if id(item) not in loops:
+                loops.update(loop_assignments(item)) # covers the loops nested in it too
+            init = item.init # declared before range_args looks at the loop
+            if isinstance(init, Variable) and declare(types, init.name, init.type_hint) and memo is not None:
+                memo.invalidate()
+            pending += reversed(for_items(item, loops[id(item)], memo, types))
+
+        else:
+            raise NotImplementedError(f"No emitter for {type(item).__name__}")
 
-    raise NotImplementedError(f"No emitter for {type(stmt).__name__}")
+def emit_stmt(stmt, memo=None, types=None):
+    """
+    Generate Python code for a single statement as a string.
+    memo is an EmitMemo kept across calls, or None; types is as in write_stmt.
+    """
+    
+    w = CodeWriter()
+    write_stmt(w, stmt, memo=memo, types=types)
+    return w.getvalue()
@@ -0,0 +1,215 @@
+"""
+Incremental re-translation for editors.
+Keeps the tokens, top-level statements and emitted code of a translated file,
+and after a text edit re-lexes, re-parses and re-emits only the top-level
+statements the edit can affect, reusing everything else.
+"""
+
+from lexer import Token, lex_java_master, LineIndex
+from parser import (
+    StreamCursor, Module, IfStatement, ForStatement, Variable, BinaryCondition, parse_statement, walk
+)
+from emitter import emit_stmt, declare
+
+
+class TopLevelStatement:
+    """
+    One top-level statement with its tokens and emitted code.
+    pos and end_pos are its character span in the current source; node is
+    None for statements the parser skips.
+    The positions of tokens and AST nodes are shifted by offset lazily, so
+    an edit does not have to touch every statement after it.
+    The code of a for loop depends on the types declared before it (see
+    emitter.write_stmt): declared lists the (name, type_hint) declarations
+    in the statement, names the names its for loops may look up, and types
+    the declared types of those names the code was emitted with.
+    """
+    __slots__ = ('pos', 'end_pos', 'tokens', 'offset', 'node', 'code', 'declared', 'names', 'types')
+
+    def __init__(self, tokens, node):
+        last = tokens[-1]
+        self.pos = tokens[0].pos
+        self.end_pos = last.pos + len(last.value)
+        self.tokens = tokens
+        self.offset = 0
+        self.node = node
+        self.code = ''
+        self.declared = []
+        self.names = set()
+        self.types = {}
+        if node is not None:
+            for n in walk(node):
+                if isinstance(n, Variable) and n.type_hint:
+                    self.declared.append((n.name, n.type_hint))
+                elif isinstance(n, ForStatement) and isinstance(n.init, Variable):
+                    self.names.add(n.init.value)
+                    if isinstance(n.condition, BinaryCondition):
+                        self.names.add(n.condition.right)
+
+    def emit(self, types):
+        # emit the code with the given declared types of self.names
+        self.types = types
+        if self.node is not None:
+            self.code = emit_stmt(self.node, types=dict(types))
+
+    def settle(self):
+        # apply the pending offset to the tokens and AST nodes
+        if self.offset:
+            for t in self.tokens:
+                t.pos += self.offset
+            if self.node is not None:
+                for node in walk(self.node):
+                    node.pos += self.offset
+                    node.end += self.offset
+            self.offset = 0
+
+
+def parse_top_level(src, lines, start=0):
+    """
+    Generator of TopLevelStatements lexed and parsed from offset start of src,
+    which must be the end of a top-level statement (or 0).
+    """
+
+    tokens = []
+
+    def lex():
+        for t in lex_java_master(src, lines, start):
+            tokens.append(t)
+            yield t
+
+    c = StreamCursor(lex(), lines)
+    while c.peek().kind != 'EOF':
+        done = len(tokens) - c.count # tokens of earlier statements
+        node = parse_statement(c)
+        yield TopLevelStatement(tokens[done:len(tokens) - c.count], node)
+
+
+class IncrementalTranslation:
+    """
+    Translation of one Java file that can be updated by text edits.
+    The top-level statements tile the token stream, and every top-level
+    statement is parsed independently of the ones before it, so an edit only
+    needs re-parsing from the first statement it touches until the new token
+    stream lines up again with an old statement boundary after the edit.
+    """
+
+    def __init__(self, src):
+        self.source = src
+        self.statements = list(parse_top_level(src, LineIndex(src)))
+        self._emit(0, len(self.statements))
+
+    @property
+    def tokens(self):
+        # token stream of the whole file, including EOF
+        tokens = []
+        for s in self.statements:
+            s.settle()
+            tokens += s.tokens
+        tokens.append(Token('EOF', '', len(self.source)))
+        return tokens
+
+    @property
+    def module(self):
+        for s in self.statements:
+            s.settle()
+        return Module(body=[s.node for s in self.statements if s.node is not None])
+
+    @property
+    def output(self):
+        return ''.join(s.code for s in self.statements)
+
+    def _emit(self, lo, hi, changed=()):
+        """
+        Emit the statements lo to hi - 1, and re-emit the later statements
+        whose for loops look up a name in changed, a name whose declarations
+        an edit changed, if its type before them is now different.
+        Declared types are only followed for the names looked up.
+        """
+
+        statements = self.statements
+        changed = set(changed)
+        needed = set(changed)
+        for s in statements[lo:hi]:
+            needed |= s.names
+        types = {}
+        for k, s in enumerate(statements):
+            if k >= hi and not changed:
+                break
+            if k >= lo and (k < hi or s.names & changed):
+                before = {name: types[name] for name in s.names if name in types}
+                if k < hi or before != s.types:
+                    s.emit(before)
+            if needed:
+                for name, hint in s.declared:
+                    if name in needed:
+                        declare(types, name, hint)
+
+    def _first_touched(self, pos):
+        # index of the first statement ending at or after pos (binary search)
+        statements = self.statements
+        lo, hi = 0, len(statements)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if statements[mid].end_pos < pos:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def edit(self, start, end, text):
+        """
+        Replace source[start:end] with text and update the translation.
+        Returns the new Python output. On a syntax error the translation is
+        left unchanged and the SyntaxError is raised.
+        """
+
+        old_src = self.source
+        statements = self.statements
+        new_src = old_src[:start] + text + old_src[end:]
+        delta = len(text) - (end - start)
+        edit_end = start + len(text) # end of the edit in the new source
+
+        # restart after the last statement the edit cannot touch; it ends
+        # with ';' or '}', whose match does not look ahead
+        first = self._first_touched(start)
+        # except a skipped statement that ran into the end of the file (e.g.
+        # 'foo ' or the closing braces of the class): text appended to the
+        # file continues it
+        if first > 0 and statements[first - 1].node is None and statements[first - 1].tokens[-1].kind != 'semicolon':
+            first -= 1
+        # an if statement only ends when the token after its '}' is not else,
+        # so an edit right after it can extend it
+        if first > 0 and isinstance(statements[first - 1].node, IfStatement):
+            first -= 1
+        restart_pos = statements[first - 1].end_pos if first > 0 else 0
+
+        # re-parse until a statement starts where an old statement started,
+        # past the edit and with the same preceding character: from there on
+        # the old tokens and statements are still valid
+        reparsed = []
+        j = first
+        for s in parse_top_level(new_src, LineIndex(new_src), restart_pos):
+            old_pos = s.pos - delta
+            if s.pos >= edit_end:
+                while j < len(statements) and statements[j].pos < old_pos:
+                    j += 1
+                if (j < len(statements) and statements[j].pos == old_pos and
+                    old_src[old_pos - 1:old_pos] == new_src[s.pos - 1:s.pos]):
+                    break
+            reparsed.append(s)
+        else:
+            j = len(statements) # reached the end of the file
+
+        for s in statements[j:]:
+            s.pos += delta
+            s.end_pos += delta
+            s.offset += delta
+        # names whose declarations the edit changed
+        old_declared = {d for s in statements[first:j] for d in s.declared}
+        new_declared = {d for s in reparsed for d in s.declared}
+        changed = {name for name, _ in old_declared ^ new_declared}
+
+        self.statements = statements[:first] + reparsed + statements[j:]
+        self.source = new_src
+        self._emit(first, first + len(reparsed), changed)
+        return self.output
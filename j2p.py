@@ -0,0 +1,10 @@
+"""
+Fast-starting command-line entry point; takes the same arguments as main.py.
+A script is compiled from source on every run while imported modules are
+loaded from their cached bytecode, so this file stays tiny and runs
+main.main from the imported main module.
+"""
+
+from main import main
+
+main()
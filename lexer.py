@@ -1,35 +1,95 @@
 import re
+import sys
+from array import array
+from bisect import bisect_right
 from rules import TOKEN_PATTERNS, TOKEN_KINDS, SYMBOLS, TYPE_KEYWORDS, CONTROL_KEYWORDS, SKIP_TOKENS
 # TOKEN_KINDS is used to create tokens with the correct kind that the parser will later consume
 
 class Token:
     """
     Represents a single lexical token from the source code.
+    Uses __slots__ so tokens carry no per-instance __dict__.
     """
+    __slots__ = ('kind', 'value', 'pos')
+    
     def __init__(self, kind, value, pos):
         self.kind = kind # category of token
         self.value = value # what the token is exactly
-        self.pos = pos # index in the original source string
+        self.pos = pos # offset in the source (in bytes for a bytes source)
         
     def __repr__(self):
         # string representation for debugging
         return f'Token({self.kind!r}, {self.value!r}, {self.pos})'
 
 
+class LineIndex:
+    """
+    Maps character offsets in a source string to line/column numbers.
+    A bytes source (e.g. a memory-mapped file) is indexed by byte offsets,
+    and its columns count bytes.
+    Built once per file; each lookup is a binary search over the line start
+    offsets instead of rescanning the source prefix.
+    The offsets are only computed on the first lookup, so an index that is
+    never used (no errors) costs nothing.
+    """
+    def __init__(self, src):
+        self.src = src
+        self._line_starts = None
+    
+    @property
+    def line_starts(self):
+        if self._line_starts is None:
+            starts = [0] # offset of the first character of each line
+            find = self.src.find
+            newline = '\n' if isinstance(self.src, str) else b'\n'
+            i = find(newline)
+            while i != -1:
+                starts.append(i + 1)
+                i = find(newline, i + 1)
+            self._line_starts = starts
+        return self._line_starts
+
+    def line_col(self, pos):
+        # 1-based line and column of the character at pos
+        line = bisect_right(self.line_starts, pos)
+        return line, pos - self.line_starts[line - 1] + 1
+
+    def describe(self, pos):
+        line, col = self.line_col(pos)
+        return f'line {line}, column {col}'
+
+
+def _unexpected_character(src, i, lines):
+    # build the index only when an error actually happens and none was given
+    if lines is None:
+        lines = LineIndex(src)
+    # in bytes, the character is the UTF-8 sequence starting at i
+    ch = src[i] if isinstance(src, str) else src[i:i + 4].decode('utf-8', 'replace')[0]
+    return SyntaxError(f'Unexpected character {ch!r} at {lines.describe(i)} (position {i})')
+
+
 """
-Generator function that tokenizes Java source code into Python tokens.
+Sequential lexer engine: tries the keyword, skip and token patterns one by one
+at every position. Kept as a reference for the master-regex engine below.
 Uses yield instead of return to produce tokens one at a time for memory efficiency.
 
 Args: 
     src (str): The Java source code to tokenize.
+    lines (LineIndex): Optional line index of src, used for error locations.
     
 Yields:
     Token: Individual tokens with kind, value, and position.
 """
-def lex_java(src: str):
+_SEQUENTIAL_PATTERNS = {} # TOKEN_PATTERNS compiled, filled on first use
+
+def lex_java_sequential(src: str, lines: LineIndex = None):
+    # compile the patterns once per process, not on every call, and only if
+    # this engine is used
+    if not _SEQUENTIAL_PATTERNS:
+        _SEQUENTIAL_PATTERNS.update((k, re.compile(v)) for k, v in TOKEN_PATTERNS.items())
+    patterns = _SEQUENTIAL_PATTERNS
     # pre-compute combined lists once before the loop
     # avoids repreated work inside the loop
-    patterns = {k: re.compile(v) for k, v in TOKEN_PATTERNS.items()}
     priority_keywords = TYPE_KEYWORDS + CONTROL_KEYWORDS
     skip_set = set(SKIP_TOKENS)
     priority_and_skip = set(priority_keywords + SKIP_TOKENS)
@@ -82,8 +142,238 @@ def lex_java(src: str):
                 yield Token(SYMBOLS[ch], ch, i)
                 i += 1
             else:
-                line_num = src[:i].count('\n') + 1
-                col_num = i - src.rfind('\n', 0, i)
-                raise SyntaxError(f'Unexpected character {ch!r} at line {line_num}, column {col_num} (position {i})')
+                raise _unexpected_character(src, i, lines)
     
     yield Token("EOF", "", n) # end of file token 
+
+
+# master regex: every pattern in one alternation of named groups
+# alternatives are tried left to right, so the group order reproduces the
+# priority used by lex_java_sequential: keywords, then skipped text, then the
+# remaining TOKEN_PATTERNS in definition order, then single-character SYMBOLS
+_PRIORITY_KEYWORDS = TYPE_KEYWORDS + CONTROL_KEYWORDS
+_MASTER_ORDER = _PRIORITY_KEYWORDS + SKIP_TOKENS + [
+    name for name in TOKEN_PATTERNS if name not in _PRIORITY_KEYWORDS and name not in SKIP_TOKENS
+]
+MASTER_PATTERN = re.compile('|'.join(
+    [f'(?P<{name}>{TOKEN_PATTERNS[name]})' for name in _MASTER_ORDER] +
+    ['(?P<SYMBOL>' + '|'.join(re.escape(ch) for ch in SYMBOLS) + ')',
+     r'(?P<MISMATCH>[\s\S])']  # anything else is a lexical error
+))
+
+# group name -> token kind, None for text that is skipped
+# kind strings are interned so every token of a kind shares one string
+MASTER_KINDS = {name: sys.intern(TOKEN_KINDS.get(name, name.lower())) for name in _MASTER_ORDER}
+for _name in SKIP_TOKENS:
+    MASTER_KINDS[_name] = None
+
+
+"""
+Master-regex lexer engine: scans the source in a single finditer pass over
+MASTER_PATTERN instead of trying each pattern in turn.
+Produces exactly the same tokens as lex_java_sequential.
+
+Args:
+    src (str): The Java source code to tokenize.
+    lines (LineIndex): Optional line index of src, used for error locations.
+    start (int): Offset to start lexing at; must be the start of a token or of
+        skipped text, e.g. the end of a previous token.
+
+Yields:
+    Token: Individual tokens with kind, value, and position.
+"""
+def lex_java_master(src: str, lines: LineIndex = None, start: int = 0):
+    kinds = MASTER_KINDS
+    for m in MASTER_PATTERN.finditer(src, start):
+        name = m.lastgroup
+        if name == 'SYMBOL':
+            ch = m.group()
+            yield Token(SYMBOLS[ch], ch, m.start())
+        elif name == 'MISMATCH':
+            raise _unexpected_character(src, m.start(), lines)
+        else:
+            kind = kinds[name]
+            if kind is not None:
+                yield Token(kind, m.group(), m.start())
+
+    yield Token("EOF", "", len(src)) # end of file token
+
+
+_MASTER_PATTERN_BYTES = None # MASTER_PATTERN for bytes, compiled on first use
+# symbol byte -> (kind, value), so symbols are never decoded
+_SYMBOL_TOKENS = {ch.encode('ascii'): (kind, ch) for ch, kind in SYMBOLS.items()}
+# groups whose text is decoded for every token; the values of all other
+# tokens (keywords, operators, identifiers) repeat and are decoded once each
+_DECODED_GROUPS = {name for name, kind in MASTER_KINDS.items()
+                   if kind in ('string', 'char_literal', 'number', 'float_number')}
+
+
+"""
+Master-regex lexer engine over UTF-8 encoded bytes, e.g. a memory-mapped
+file, so the source never has to be decoded into one large string.
+Token values are decoded from the matched bytes only: literals per token,
+keywords, operators and identifiers once per distinct text, symbols never.
+Token positions are byte offsets; give a LineIndex of the same bytes.
+Outside literals and comments the tokens are those of lex_java_master on the
+decoded text (\\s, \\d and \\b only match ASCII here, the only characters the
+patterns are meant for).
+
+Args:
+    src (bytes-like): The UTF-8 encoded Java source, bytes or an mmap.
+    lines (LineIndex): Optional line index of src, used for error locations.
+    start (int): Byte offset to start lexing at, as for lex_java_master.
+
+Yields:
+    Token: Individual tokens with kind, value, and byte position.
+"""
+def lex_java_bytes(src, lines: LineIndex = None, start: int = 0):
+    global _MASTER_PATTERN_BYTES
+    if _MASTER_PATTERN_BYTES is None:
+        _MASTER_PATTERN_BYTES = re.compile(MASTER_PATTERN.pattern.encode('ascii'))
+    kinds = MASTER_KINDS
+    symbols = _SYMBOL_TOKENS
+    decoded = _DECODED_GROUPS
+    values = {} # matched bytes -> shared decoded value
+    for m in _MASTER_PATTERN_BYTES.finditer(src, start):
+        name = m.lastgroup
+        if name == 'SYMBOL':
+            kind, value = symbols[m.group()]
+            yield Token(kind, value, m.start())
+        elif name == 'MISMATCH':
+            raise _unexpected_character(src, m.start(), lines)
+        else:
+            kind = kinds[name]
+            if kind is None:
+                continue
+            text = m.group()
+            if name in decoded:
+                value = text.decode('utf-8')
+            else:
+                value = values.get(text)
+                if value is None:
+                    value = values[text] = text.decode('utf-8')
+            yield Token(kind, value, m.start())
+
+    yield Token("EOF", "", len(src)) # end of file token
+
+
+# compact token kinds: every kind the lexer can produce gets a small integer id
+KIND_NAMES = list(dict.fromkeys(
+    [kind for kind in MASTER_KINDS.values() if kind is not None] +
+    [sys.intern(kind) for kind in SYMBOLS.values()] + ['EOF']
+))
+KIND_IDS = {kind: i for i, kind in enumerate(KIND_NAMES)}
+_GROUP_KIND_IDS = {name: (None if kind is None else KIND_IDS[kind]) for name, kind in MASTER_KINDS.items()}
+_SYMBOL_KIND_IDS = {ch: KIND_IDS[kind] for ch, kind in SYMBOLS.items()}
+
+
+class TokenBuffer:
+    """
+    Struct-of-arrays token stream.
+    Stores one byte of kind id plus start and end offsets per token and
+    slices token values lazily from the source, instead of keeping a Token
+    object and a value string alive for every token.
+    Supports len(), indexing and iteration, so a Cursor can consume it directly;
+    indexing builds a Token on demand.
+    src may be a piece of a larger source starting at offset base, with the
+    offsets still those of the whole source.
+    """
+    
+    def __init__(self, src, base=0):
+        self.src = src
+        self.base = base # offset of src[0] in the whole source
+        self.kinds = array('B') # index into KIND_NAMES
+        self.starts = array('I') # offset of the first character
+        self.ends = array('I') # offset one past the last character
+        
+    def append(self, kind_id, start, end):
+        self.kinds.append(kind_id)
+        self.starts.append(start)
+        self.ends.append(end)
+    
+    def __len__(self):
+        return len(self.kinds)
+    
+    def __getitem__(self, idx):
+        start = self.starts[idx]
+        base = self.base
+        return Token(KIND_NAMES[self.kinds[idx]], self.src[start - base:self.ends[idx] - base], start)
+    
+    def __iter__(self):
+        # same tokens as indexing, without a method call per token
+        src, base, names = self.src, self.base, KIND_NAMES
+        for kind, start, end in zip(self.kinds, self.starts, self.ends):
+            yield Token(names[kind], src[start - base:end - base], start)
+
+
+def lex_java_buffer(src: str, lines: LineIndex = None):
+    """
+    Tokenize Java source code into a TokenBuffer.
+    Same tokens as lex_java_master, but no Token objects are created.
+    """
+    buf = TokenBuffer(src)
+    error = lex_into_buffer(buf, src)
+    if error is not None:
+        raise _unexpected_character(src, error, lines)
+    buf.append(KIND_IDS['EOF'], len(src), len(src)) # end of file token
+    return buf
+
+
+def lex_into_buffer(buf: TokenBuffer, src: str, offset: int = 0):
+    """
+    Append the tokens of src to buf, without the EOF token, adding offset
+    to their positions (for src being a chunk of a larger source).
+    Returns the position of the unexpected character lexing stopped at,
+    or None when all of src was lexed.
+    """
+    kinds, starts, ends = buf.kinds, buf.starts, buf.ends
+    group_ids = _GROUP_KIND_IDS
+    for m in MASTER_PATTERN.finditer(src):
+        name = m.lastgroup
+        if name == 'SYMBOL':
+            kind_id = _SYMBOL_KIND_IDS[m.group()]
+        elif name == 'MISMATCH':
+            return m.start() + offset
+        else:
+            kind_id = group_ids[name]
+            if kind_id is None:
+                continue
+        start, end = m.span()
+        kinds.append(kind_id)
+        starts.append(start + offset)
+        ends.append(end + offset)
+    return None
+
+
+def lex_java_parallel(src: str, lines: LineIndex = None):
+    # see parallel.lex_parallel; imported on use, the process pool machinery
+    # is only needed by this engine
+    from parallel import lex_parallel
+    return lex_parallel(src, lines)
+
+
+# available lexer engines, selectable by name
+LEX_ENGINES = {
+    'master': lex_java_master,
+    'sequential': lex_java_sequential,
+    'parallel': lex_java_parallel,
+}
+DEFAULT_ENGINE = 'master'
+
+
+def lex_java(src: str, engine: str = DEFAULT_ENGINE, lines: LineIndex = None):
+    """
+    Tokenize Java source code with the selected lexer engine.
+    Returns a generator of tokens.
+    A source that is not a str (bytes or an mmap, see main.map_file) is
+    lexed by lex_java_bytes, the master engine over bytes.
+    """
+    try:
+        lex = LEX_ENGINES[engine]
+    except KeyError:
+        raise ValueError(f'Unknown lexer engine {engine!r}, expected one of {sorted(LEX_ENGINES)}')
+    if not isinstance(src, str):
+        if lex is not lex_java_master:
+            raise ValueError(f'Lexer engine {engine!r} cannot lex bytes, use the master engine')
+        return lex_java_bytes(src, lines)
+    return lex(src, lines)
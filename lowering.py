@@ -0,0 +1,307 @@
+"""
+Lowering of the translator's AST to a Python ast.Module.
+A backend next to the text emitter for callers that execute the translation
+right away: the ast.Module is compiled directly, so CPython does not have to
+tokenize and parse generated source text again. Every Python node carries the
+line and column of the Java code it came from, so tracebacks point into the
+Java source.
+Follows emitter.py statement for statement; like write_stmt and
+emit_condition, nested statements and conditions are lowered with explicit
+stacks instead of recursion.
+"""
+
+import ast
+import gc
+import re
+from bisect import bisect_right
+from parser import (
+    Print, Variable, IfStatement, BinaryCondition,
+    LogicalCondition, WhileStatement, VarUpdate, ForStatement
+)
+from emitter import (
+    range_args, loop_assignments, declare, PRINT_BUFFER_PRELUDE, PRINT_BUFFER_EPILOGUE, PRINT_BUFFER_LINES,
+    MAIN_FUNCTION_HEADER, MAIN_FUNCTION_GUARD, INDENT
+)
+
+# operator and context nodes carry no location and are shared by all nodes
+LOAD = ast.Load()
+STORE = ast.Store()
+ADD = ast.Add()
+SUB = ast.Sub()
+COMPARE_OPS = {
+    '==': ast.Eq(), '!=': ast.NotEq(), '<': ast.Lt(),
+    '>': ast.Gt(), '<=': ast.LtE(), '>=': ast.GtE(),
+}
+BOOL_OPS = {'&&': ast.And(), '||': ast.Or()}
+IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z_0-9]*\Z')
+NUMBER = re.compile(r'\d+(\.\d+)?([fF])?\Z')
+
+
+class Location:
+    """
+    Source location given to the Python nodes lowered from one Java
+    statement: from the statement's first token to the end of that line.
+    """
+    __slots__ = ('lineno', 'col_offset', 'end_col_offset')
+
+    def __init__(self, lines, pos):
+        starts = lines.line_starts
+        self.lineno = line = bisect_right(starts, pos)
+        self.col_offset = pos - starts[line - 1]
+        # up to the end of the line; a span covering the whole line is shown
+        # in tracebacks without carets
+        line_end = starts[line] - 1 if line < len(starts) else len(lines.src)
+        self.end_col_offset = line_end - starts[line - 1]
+
+    def at(self, node):
+        node.lineno = node.end_lineno = self.lineno
+        node.col_offset = self.col_offset
+        node.end_col_offset = self.end_col_offset
+        return node
+
+
+def _convert_value(val):
+    # (True, name) for identifiers, (False, Python value) for literals
+    if val == 'true' or val == 'false':
+        return False, val == 'true'
+    if val[:1] in ('"', "'") and len(val) >= 2:
+        # without escapes the text between the quotes is the value
+        if '\\' not in val:
+            return False, val[1:-1]
+        return False, ast.literal_eval(val)
+    m = NUMBER.match(val)
+    if m:
+        if m.group(2):
+            return False, float(val[:-1])
+        return False, float(val) if m.group(1) else int(val)
+    if IDENTIFIER.match(val):
+        return True, val
+    return None
+
+
+def lower_value(val, loc, converted):
+    """
+    Python expression node for a Java literal or identifier, with the same
+    value emit_value's text would have.
+    converted caches the conversion of each distinct value text.
+    """
+
+    conversion = converted.get(val)
+    if conversion is None:
+        conversion = converted[val] = _convert_value(val)
+        if conversion is None:
+            raise SyntaxError(f'Cannot translate value {val!r} at line {loc.lineno}, column {loc.col_offset + 1}')
+    is_name, value = conversion
+    if is_name:
+        return loc.at(ast.Name(value, LOAD))
+    return loc.at(ast.Constant(value))
+
+
+def lower_condition(cond, loc, converted):
+    """
+    Python expression node for a condition, located at loc.
+    Chains of the same logical operator become a single BoolOp, which keeps
+    long && / || chains flat for the compiler.
+    """
+
+    results = []
+    pending = [cond] # next item last; tuples are (bool op, operand count)
+    while pending:
+        item = pending.pop()
+        if isinstance(item, tuple):
+            op, count = item
+            values = results[-count:]
+            del results[-count:]
+            results.append(loc.at(ast.BoolOp(op, values)))
+
+        elif isinstance(item, LogicalCondition):
+            operands = [item.left]
+            right = item.right
+            while isinstance(right, LogicalCondition) and right.operator == item.operator:
+                operands.append(right.left)
+                right = right.right
+            operands.append(right)
+            pending.append((BOOL_OPS[item.operator], len(operands)))
+            pending += reversed(operands)
+
+        elif isinstance(item, BinaryCondition):
+            left = lower_value(item.left, loc, converted)
+            if item.operator:
+                right = lower_value(item.right, loc, converted)
+                results.append(loc.at(ast.Compare(left, [COMPARE_OPS[item.operator]], [right])))
+            else:
+                results.append(left)
+
+        else:
+            raise NotImplementedError(f'No lowering for {type(item).__name__}')
+    return results[0]
+
+
+def lower_bound(arg, loc):
+    # expression node for a (name, offset) range argument, see emitter.range_args
+    name, offset = arg
+    if name is None:
+        return loc.at(ast.Constant(offset))
+    node = loc.at(ast.Name(name, LOAD))
+    if offset == 0:
+        return node
+    op = ADD if offset > 0 else SUB
+    return loc.at(ast.BinOp(node, op, loc.at(ast.Constant(abs(offset)))))
+
+
+def lower_print(item, loc, converted, buffered):
+    """
+    Python statement nodes for a Print node: a print() call, or with
+    buffered=True an append to the print buffer followed by the size check
+    (see emitter.PRINT_BUFFER_PRELUDE).
+    """
+
+    value = lower_value(item.args[0], loc, converted)
+    if not buffered:
+        keywords = [] if item.newline else [loc.at(ast.keyword('end', loc.at(ast.Constant(''))))]
+        return [loc.at(ast.Expr(loc.at(ast.Call(loc.at(ast.Name('print', LOAD)), [value], keywords))))]
+
+    newline = '\n' if item.newline else ''
+    if isinstance(value, ast.Constant) and isinstance(value.value, str):
+        text = loc.at(ast.Constant(value.value + newline))
+    else:
+        parts = [loc.at(ast.FormattedValue(value, -1, None))]
+        if newline:
+            parts.append(loc.at(ast.Constant(newline)))
+        text = loc.at(ast.JoinedStr(parts))
+    write = loc.at(ast.Expr(loc.at(ast.Call(loc.at(ast.Name('_print_write', LOAD)), [text], []))))
+    size = loc.at(ast.Call(loc.at(ast.Name('len', LOAD)), [loc.at(ast.Name('_print_buffer', LOAD))], []))
+    full = loc.at(ast.Compare(size, [COMPARE_OPS['>=']], [loc.at(ast.Constant(PRINT_BUFFER_LINES))]))
+    flush = loc.at(ast.Expr(loc.at(ast.Call(loc.at(ast.Name('_print_flush', LOAD)), [], []))))
+    return [write, loc.at(ast.If(full, [flush], []))]
+
+
+def lower_statements(stmts, lines, buffered=False):
+    """
+    List of Python statement nodes for a list of AST statements.
+    Compound statements are appended to their list at once and their bodies
+    are filled in as the work stack reaches them.
+    buffered is as in lower_print.
+    """
+
+    out = []
+    pending = [] # (statement, list to append it to, enclosing location), next item last
+    converted = {} # value text -> conversion, see lower_value
+    loops = {} # loop_assignments of the for loops met so far
+    types = {} # declared types, see emitter.write_stmt
+
+    def push_block(stmts, body, loc):
+        # Python needs at least one statement in a block, Java allows {}
+        if not stmts:
+            body.append(loc.at(ast.Pass()))
+        pending.extend((stmt, body, loc) for stmt in reversed(stmts))
+
+    pending.extend((stmt, out, None) for stmt in reversed(stmts))
+    while pending:
+        item, target, loc = pending.pop()
+        if isinstance(item, ast.AST):
+            # an already lowered node waiting for its turn
+            target.append(item)
+            continue
+
+        if item.pos is not None: # nodes built without a position use their parent's
+            loc = Location(lines, item.pos)
+        elif loc is None:
+            loc = Location(lines, 0)
+        if isinstance(item, Print):
+            target += lower_print(item, loc, converted, buffered)
+
+        elif isinstance(item, Variable):
+            declare(types, item.name, item.type_hint)
+            target.append(loc.at(ast.Assign([loc.at(ast.Name(item.name, STORE))],
+                                             lower_value(item.value, loc, converted))))
+
+        elif isinstance(item, VarUpdate):
+            op = ADD if item.delta >= 0 else SUB
+            target.append(loc.at(ast.AugAssign(loc.at(ast.Name(item.name, STORE)), op,
+                                               loc.at(ast.Constant(abs(item.delta))))))
+
+        elif isinstance(item, IfStatement):
+            node = loc.at(ast.If(lower_condition(item.condition, loc, converted), [], []))
+            target.append(node)
+            push_block(item.body, node.body, loc)
+            if item.else_if:
+                pending.append((item.else_if, node.orelse, loc)) # elif
+            elif item.else_body:
+                push_block(item.else_body, node.orelse, loc)
+
+        elif isinstance(item, WhileStatement):
+            node = loc.at(ast.While(lower_condition(item.condition, loc, converted), [], []))
+            target.append(node)
+            push_block(item.body, node.body, loc)
+
+        elif isinstance(item, ForStatement):
+            if id(item) not in loops:
+                loops.update(loop_assignments(item))
+            if isinstance(item.init, Variable):
+                declare(types, item.init.name, item.init.type_hint)
+            args = range_args(item, loops[id(item)], types)
+            if args:
+                call = loc.at(ast.Call(loc.at(ast.Name('range', LOAD)),
+                                       [lower_bound(arg, loc) for arg in args], []))
+                node = loc.at(ast.For(loc.at(ast.Name(item.init.name, STORE)), call, [], []))
+                target.append(node)
+                push_block(item.body, node.body, loc)
+                continue
+
+            # fallback: init, then a while loop ending with the update
+            if item.condition is None:
+                test = loc.at(ast.Constant(True))
+            else:
+                test = lower_condition(item.condition, loc, converted)
+            node = loc.at(ast.While(test, [], []))
+            body = item.body if item.update is None else item.body + [item.update]
+            push_block(body, node.body, loc)
+            pending.append((node, target, loc))
+            if item.init is not None:
+                pending.append((item.init, target, loc)) # before the loop
+
+        else:
+            raise NotImplementedError(f'No lowering for {type(item).__name__}')
+    return out
+
+
+def support_code(lines):
+    # statement nodes of the given lines of code that has no Java source
+    # (print buffer, main function), at line 1
+    nodes = ast.parse('\n'.join(lines)).body
+    for node in nodes:
+        for child in ast.walk(node):
+            if 'lineno' in child._attributes:
+                child.lineno = child.end_lineno = 1
+    return nodes
+
+
+def lower_module(mod, lines, buffered=False, main_function=False):
+    """
+    Python ast.Module for a Module AST node.
+    lines is the LineIndex of the Java source the node positions refer to.
+    With buffered=True prints go through a buffer, and with main_function=True
+    the statements are the body of a main() function, as in
+    emitter.emit_module.
+    """
+
+    # the Python AST is a tree without reference cycles, so the cyclic garbage
+    # collector would only keep rescanning the nodes allocated so far
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        body = lower_statements(mod.body, lines, buffered)
+        epilogue = support_code(PRINT_BUFFER_EPILOGUE) if buffered else []
+        if main_function:
+            function = support_code([MAIN_FUNCTION_HEADER, f'{INDENT}pass'])[0]
+            function.body = body or function.body
+            guard = support_code(MAIN_FUNCTION_GUARD)[0]
+            guard.body += epilogue
+            body, epilogue = [function, guard], []
+        if buffered:
+            body = support_code(PRINT_BUFFER_PRELUDE) + body + epilogue
+        return ast.Module(body=body, type_ignores=[])
+    finally:
+        if enabled:
+            gc.enable()
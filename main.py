@@ -1,28 +1,163 @@
-import argparse
+from __future__ import annotations # annotations name classes that are imported lazily
+import os
 import sys
-from lexer import lex_java
-from parser import parse_module
-from emitter import emit_module
+from lexer import lex_java, LineIndex, LEX_ENGINES, DEFAULT_ENGINE
+from parser import parse_module, iter_statements
+from emitter import emit_module, emit_module_to, emit_statements_to
+from cache import DEFAULT_CACHE_SIZE
+# everything else (argparse, the optimizer, the cache itself, profiling and
+# source maps) is imported where it is needed, so translating one small file starts fast
+# (see bench.py startup)
 
-def translate_str(java_src: str) -> str:
-    tokens = list(lex_java(java_src))
-    mod = parse_module(tokens)
-    return emit_module(mod)    
+def translate_str(java_src: str, engine: str = DEFAULT_ENGINE, stream: bool = True, stats: TranslationStats = None,
+                  source_map: SourceMap = None, optimize: bool = False, buffered: bool = False,
+                  main_function: bool = False, intern: bool = False) -> str:
+    if stats is not None:
+        # phases run one after another so each one can be measured
+        from profiling import translate_profiled
+        return translate_profiled(java_src, stats, engine, optimize, buffered, main_function, intern)
+    lines = LineIndex(java_src) # shared by lexer and parser error messages
+    tokens = lex_java(java_src, engine, lines)
+    # streaming interleaves lexing and parsing, otherwise all tokens are lexed first
+    mod = parse_module(tokens, lines, stream=stream, intern=intern)
+    if optimize:
+        from optimizer import optimize_module
+        mod = optimize_module(mod)
+    if source_map is not None:
+        source_map.lines = lines
+    return emit_module(mod, source_map, buffered, main_function, memoize=intern)    
+
+def translate_to_code(java_src: str, filename: str = '<java>', engine: str = DEFAULT_ENGINE,
+                      optimize: bool = False, buffered: bool = False, main_function: bool = False):
+    """
+    Translate Java source straight to a Python code object, ready for exec().
+    The AST is lowered to a Python ast.Module instead of source text, so
+    nothing is parsed twice, and line numbers in tracebacks are those of the
+    Java source in filename.
+    """
+    from lowering import lower_module # only needed on this path
+    lines = LineIndex(java_src)
+    mod = parse_module(lex_java(java_src, engine, lines), lines, stream=True)
+    if optimize:
+        from optimizer import optimize_module
+        mod = optimize_module(mod)
+    return compile(lower_module(mod, lines, buffered, main_function), filename, 'exec')
+
+def translate_to(java_src: str, out, engine: str = DEFAULT_ENGINE, stream: bool = True,
+                 source_map: SourceMap = None, optimize: bool = False, buffered: bool = False,
+                 main_function: bool = False, intern: bool = False):
+    """
+    Translate Java source and write the Python code to the text stream out,
+    statement by statement as they are parsed.
+    If a SourceMap is given it is filled with the Java line of every output line.
+    With optimize the whole module is parsed first: whether a variable is a
+    constant depends on all of the code.
+    With buffered, prints in the generated code are buffered (see
+    emitter.PRINT_BUFFER_PRELUDE).
+    With main_function, the code is put in a main() function (see
+    emitter.emit_module).
+    With intern, repeated subtrees of the AST are shared and their code is
+    formatted once (see parser.Interner and emitter.EmitMemo); the nodes
+    then have no positions, so no source map can be filled.
+    """
+    lines = LineIndex(java_src)
+    if source_map is not None:
+        source_map.lines = lines
+    tokens = lex_java(java_src, engine, lines)
+    if optimize:
+        from optimizer import optimize_module
+        mod = optimize_module(parse_module(tokens, lines, stream=stream, intern=intern))
+        emit_module_to(out, mod, source_map, buffered, main_function, intern)
+        return
+    emit_statements_to(out, iter_statements(tokens, lines, stream=stream, intern=intern), source_map, buffered,
+                       main_function, intern)
+
+def map_file(path: str):
+    """
+    Read-only memory map of the file at path, to translate a large file
+    without reading it into a string: every translate function accepts it in
+    place of the source text and lexes it as UTF-8 bytes (see
+    lexer.lex_java_bytes). Positions in error messages and source maps are
+    then byte offsets. An empty file, which cannot be mapped, gives b''.
+    """
+    import mmap
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    # the lexer reads the file front to back once
+    if hasattr(data, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+        data.madvise(mmap.MADV_SEQUENTIAL)
+    return data
+    
+def open_output(path: str):
+    """
+    Open the output file for writing as (text file, temporary path). The code
+    is written to a temporary file next to path that the caller renames over
+    path once the translation succeeded (or deletes), so a failed translation
+    never truncates an existing output. Outputs that are not regular files,
+    like /dev/stdout, are written directly and the temporary path is None.
+    """
+    if os.path.exists(path) and not os.path.isfile(path):
+        return open(path, 'w', encoding='utf-8'), None
+    import tempfile
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        # mkstemp creates the file private, give it the mode open() would have
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            umask = os.umask(0)
+            os.umask(umask)
+            mode = 0o666 & ~umask
+        os.chmod(tmp_path, mode)
+        return os.fdopen(fd, 'w', encoding='utf-8'), tmp_path
+    except BaseException:
+        os.close(fd)
+        os.unlink(tmp_path)
+        raise
+    
+# option values when not given on the command line; every option of
+# parse_args needs an entry, simple_args builds its result from these alone
+CLI_DEFAULTS = {
+    'output': None, 'dry_run': False, 'run': False, 'optimize': False, 'buffer_prints': False,
+    'main_function': False, 'intern': False, 'mmap': False, 'parallel': False, 'lexer': DEFAULT_ENGINE, 'cursor': 'stream',
+    'batch': False, 'watch': False, 'poll': False,
+    'interval': 0.5, 'debounce': 0.1, 'jobs': None, 'cache_dir': None,
+    'cache_size': DEFAULT_CACHE_SIZE // (1024 * 1024), 'source_map': None,
+    'profile': False, 'profile_memory': False, 'profile_json': None, 'cprofile': None,
+}
+
+def simple_args(argv):
+    """
+    Options for the common 'INPUT [OUTPUT] [--dry-run]' command line, parsed
+    without argparse, whose import and setup are a noticeable part of
+    translating a small file. None for any other command line.
+    """
+    paths = [arg for arg in argv if arg != '--dry-run']
+    if not 1 <= len(paths) <= 2 or any(path.startswith('-') for path in paths):
+        return None
+    from types import SimpleNamespace
+    return SimpleNamespace(**dict(CLI_DEFAULTS, input=paths[0], output=paths[1] if len(paths) == 2 else None,
+                                  dry_run='--dry-run' in argv))
+
+def parse_args(argv):
+    import argparse
     
-if __name__ == '__main__':
     parser = argparse.ArgumentParser(
         description='Translate Java code to Python'
     )
     # requires the user to pass an input file path
     parser.add_argument(
         'input',
-        help='Path to the input Java source file.'
+        help='Path to the input Java source file (source directory with --batch or --watch).'
     )
     
     parser.add_argument(
         'output',
         nargs='?', #output may be absent
-        help='Path to the output Python file. If omitted, prints to stdout.'
+        help='Path to the output Python file. If omitted, prints to stdout. '
+             'Output directory with --batch or --watch.'
     )
     
     parser.add_argument(
@@ -31,11 +166,192 @@ if __name__ == '__main__':
         help='Print translated code instead of writing to a file.'
     )
     
-    args = parser.parse_args()
+    parser.add_argument(
+        '--run',
+        action='store_true',
+        help='Execute the translated program instead of writing it out.'
+    )
+    
+    parser.add_argument(
+        '-O', '--optimize',
+        action='store_true',
+        help='Fold constant conditions and remove unreachable branches and loops.'
+    )
+    
+    parser.add_argument(
+        '--buffer-prints',
+        action='store_true',
+        help='Make the generated program collect printed lines and write them in blocks.'
+    )
+    
+    parser.add_argument(
+        '--main-function',
+        action='store_true',
+        help="Put the generated program in a main() function run under if __name__ == '__main__', "
+             'so its variables are fast locals.'
+    )
+    
+    parser.add_argument(
+        '--intern',
+        action='store_true',
+        help='Share repeated statements and conditions in the AST and format their code once '
+             '(for large machine-generated sources).'
+    )
+    
+    parser.add_argument(
+        '--mmap',
+        action='store_true',
+        help='Memory-map the input and lex it as bytes instead of reading it into memory (for very large files).'
+    )
+    
+    parser.add_argument(
+        '--parallel',
+        action='store_true',
+        help='Lex, parse and emit a single large file in worker processes (-j sets how many).'
+    )
+    
+    parser.add_argument(
+        '--lexer',
+        choices=sorted(LEX_ENGINES),
+        help='Lexer engine to use (default: %(default)s).'
+    )
+    
+    parser.add_argument(
+        '--cursor',
+        choices=['stream', 'list'],
+        help='Feed tokens to the parser lazily (stream) or lex the whole file first (list).'
+    )
+    
+    parser.add_argument(
+        '--batch',
+        action='store_true',
+        help='Translate every .java file under the input directory into the output directory.'
+    )
+    
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep the output directory up to date, retranslating .java files as they change.'
+    )
+    
+    parser.add_argument(
+        '--poll',
+        action='store_true',
+        help='With --watch, poll for changes instead of using inotify.'
+    )
+    
+    parser.add_argument(
+        '--interval',
+        type=float,
+        help='Seconds between scans when polling (default: %(default)s).'
+    )
+    
+    parser.add_argument(
+        '--debounce',
+        type=float,
+        help='Seconds the tree must stay unchanged before a rebuild (default: %(default)s).'
+    )
+    
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        help='Number of worker processes for --batch and --parallel (default: number of CPUs).'
+    )
+    
+    parser.add_argument(
+        '--cache-dir',
+        help='Directory of the translation cache; unchanged sources skip translation.'
+    )
+    
+    parser.add_argument(
+        '--cache-size',
+        type=int,
+        help='Maximum size of the translation cache in MB (default: %(default)s).'
+    )
+    
+    parser.add_argument(
+        '--source-map',
+        metavar='FILE',
+        help='Write a JSON map from output lines to Java lines to FILE (bypasses the cache).'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Print wall time, token count and AST node counts of each phase to stderr.'
+    )
+    
+    parser.add_argument(
+        '--profile-memory',
+        action='store_true',
+        help='With --profile, also record peak memory of each phase (slows translation down).'
+    )
+    
+    parser.add_argument(
+        '--profile-json',
+        metavar='FILE',
+        help='Write the per-phase profile as JSON to FILE.'
+    )
+    
+    parser.add_argument(
+        '--cprofile',
+        metavar='FILE',
+        help='Run the translation under cProfile and dump the statistics to FILE.'
+    )
+    
+    parser.set_defaults(**CLI_DEFAULTS)
+    args = parser.parse_args(argv)
+    if (args.batch or args.watch) and args.output is None:
+        parser.error('--batch and --watch require an output directory')
+    if (args.batch or args.watch) and (args.dry_run or args.run or args.mmap or args.parallel or args.source_map or
+                                       args.profile or args.profile_memory or args.profile_json or args.cprofile):
+        # these work on a single file
+        parser.error('--batch and --watch cannot be combined with --dry-run, --run, --mmap, --parallel, '
+                     '--source-map or profiling')
+    if args.mmap and args.lexer != 'master':
+        parser.error('--mmap only works with the master lexer')
+    if args.parallel and (args.mmap or args.run or args.optimize or args.source_map or args.profile or
+                          args.profile_memory or args.profile_json or args.cprofile):
+        # these need the whole module or all positions in one process
+        parser.error('--parallel cannot be combined with --mmap, --run, -O, --source-map or profiling')
+    if args.intern and (args.run or args.source_map or args.parallel):
+        # shared nodes have no source positions
+        parser.error('--intern cannot be combined with --run, --source-map or --parallel')
+    return args
+
+def main(argv=None):
+    """
+    Command-line interface, see parse_args for the options.
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    args = simple_args(argv) or parse_args(argv)
+    cache_size = args.cache_size * 1024 * 1024
+    
+    if args.batch or args.watch:
+        if not os.path.isdir(args.input):
+            print(f"Error: Input directory '{args.input}' not found.", file=sys.stderr)
+            sys.exit(1)
+        # translate_str options for every file
+        options = dict(optimize=args.optimize, buffered=args.buffer_prints, main_function=args.main_function,
+                       intern=args.intern, stream=args.cursor == 'stream')
+        if args.watch:
+            from watch import watch_tree
+            watch_tree(args.input, args.output, engine=args.lexer, cache_dir=args.cache_dir,
+                       cache_size=cache_size, poll=args.poll, interval=args.interval,
+                       debounce=args.debounce, **options)
+            sys.exit(0)
+        from batch import translate_tree # imported here, batch itself imports this module
+        failed = translate_tree(args.input, args.output, jobs=args.jobs, engine=args.lexer,
+                                cache_dir=args.cache_dir, cache_size=cache_size, **options)
+        sys.exit(2 if failed else 0)
     
     try: 
-        with open(args.input, 'r', encoding='utf-8') as f:
-            java_src = f.read()
+        if args.mmap:
+            java_src = map_file(args.input)
+        else:
+            with open(args.input, 'r', encoding='utf-8') as f:
+                java_src = f.read()
     except FileNotFoundError:
         print(f"Error: Input file '{args.input}' not found.", file=sys.stderr)
         sys.exit(1)
@@ -46,28 +362,134 @@ if __name__ == '__main__':
         print(f"Error reading '{args.input}': {e}", file=sys.stderr)
         sys.exit(1)
         
+    if args.run:
+        try:
+            code = translate_to_code(java_src, args.input, args.lexer, args.optimize, args.buffer_prints,
+                                     args.main_function)
+        except SyntaxError as e:
+            print(f"Syntax error in Java code ({args.input}): {e}", file=sys.stderr)
+            sys.exit(2)
+        except Exception as e:
+            print(f"Translation error: {e}", file=sys.stderr)
+            sys.exit(2)
+        exec(code, {'__name__': '__main__'})
+        sys.exit(0)
+    
+    stats = None
+    if args.profile or args.profile_memory or args.profile_json or args.cprofile:
+        from profiling import TranslationStats
+        stats = TranslationStats(memory=args.profile_memory)
+    
+    def translate(src):
+        if args.parallel:
+            from parallel import translate_parallel
+            return translate_parallel(src, args.jobs, args.buffer_prints, args.main_function)
+        return translate_str(src, args.lexer, stream=args.cursor == 'stream', stats=stats,
+                             optimize=args.optimize, buffered=args.buffer_prints,
+                             main_function=args.main_function, intern=args.intern)
+    
+    if args.cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+        untraced = translate
+        
+        def translate(src):
+            return profiler.runcall(untraced, src)
+    
+    to_stdout = args.dry_run or args.output is None
+    
+    # open the destination first so statements are written as they are emitted
+    tmp_path = None
+    if to_stdout:
+        out = sys.stdout
+    else:
+        try:
+            out, tmp_path = open_output(args.output)
+        except PermissionError:
+            print(f"Error: Permission denied writing to '{args.output}'.", file=sys.stderr)
+            sys.exit(1)
+        except IOError as e:
+            print(f"Error writing to '{args.output}': {e}", file=sys.stderr)
+            sys.exit(1)
+    
+    def discard_output():
+        # do not leave a partially translated file behind, an existing output is kept as it was
+        if not to_stdout:
+            out.close()
+            if tmp_path is not None:
+                os.unlink(tmp_path)
+    
+    source_map = None
+    if args.source_map:
+        from sourcemap import SourceMap
+        source_map = SourceMap(args.input)
+    
     try: 
-        py_code = translate_str(java_src)
+        if source_map is not None:
+            # the cache keeps only the code, so a mapped translation always runs
+            translate_to(java_src, out, args.lexer, stream=args.cursor == 'stream', source_map=source_map,
+                         optimize=args.optimize, buffered=args.buffer_prints, main_function=args.main_function)
+        elif args.cache_dir is None and args.parallel:
+            from parallel import translate_parallel_to
+            translate_parallel_to(java_src, out, args.jobs, args.buffer_prints, args.main_function)
+        elif args.cache_dir is None and stats is None:
+            translate_to(java_src, out, args.lexer, stream=args.cursor == 'stream', optimize=args.optimize,
+                         buffered=args.buffer_prints, main_function=args.main_function, intern=args.intern)
+        elif args.cache_dir is None:
+            out.write(translate(java_src))
+        else:
+            from cache import TranslationCache, cache_variant
+            cache = TranslationCache(args.cache_dir, cache_size,
+                                     variant=cache_variant(args.optimize, args.buffer_prints, args.main_function))
+            out.write(cache.translate(java_src, translate))
+            print(cache.stats(), file=sys.stderr)
+        if to_stdout:
+            out.write('\n') # same trailing blank line print() used to add
     except SyntaxError as e:
-        print(f"Syntax error in Java code: {e}", file=sys.stderr)
+        discard_output()
+        print(f"Syntax error in Java code ({args.input}): {e}", file=sys.stderr)
         sys.exit(2)
+    except IOError as e:
+        discard_output()
+        print(f"Error writing to '{args.output or '<stdout>'}': {e}", file=sys.stderr)
+        sys.exit(1)
     except Exception as e:
+        discard_output()
         print(f"Translation error: {e}", file=sys.stderr)
         sys.exit(2)
     
-    if args.dry_run or args.output is None:
-        print(py_code)
-    else:
+    if not to_stdout:
         try:
-            with open(args.output, 'w', encoding='utf-8') as f:
-                f.write(py_code)
-            print(f"Successfully translated '{args.input}' to '{args.output}'")
-        except PermissionError:
-            print(f"Error: Permission denied writing to '{args.output}'.", file=sys.stderr)
+            out.close()
+            if tmp_path is not None:
+                os.replace(tmp_path, args.output)
+        except IOError as e:
+            discard_output()
+            print(f"Error writing to '{args.output}': {e}", file=sys.stderr)
             sys.exit(1)
+        print(f"Successfully translated '{args.input}' to '{args.output}'")
+    
+    if source_map is not None:
+        try:
+            with open(args.source_map, 'w', encoding='utf-8') as f:
+                f.write(source_map.to_json())
         except IOError as e:
-            print(f"Error warning to '{args.output}': {e}", file=sys.stderr)
+            print(f"Error writing source map to '{args.source_map}': {e}", file=sys.stderr)
             sys.exit(1)
-            
-        
-    
\ No newline at end of file
+    
+    # a cache hit runs no phases, so there is nothing to report
+    if stats is not None and stats.phases:
+        if args.profile or args.profile_memory:
+            print(stats.report(), file=sys.stderr)
+        try:
+            if args.profile_json:
+                with open(args.profile_json, 'w', encoding='utf-8') as f:
+                    f.write(stats.to_json())
+            if args.cprofile:
+                profiler.dump_stats(args.cprofile)
+        except IOError as e:
+            print(f"Error writing profile: {e}", file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""
+Optional optimization pass between parse_module and the emitter.
+Evaluates conditions whose value is known at translation time and removes
+the code they make unreachable:
+- a variable declared once from an int or boolean literal and never assigned
+  again is a constant, and its uses in conditions are replaced by the value
+- comparisons of two literals, and && / || with a literal operand, are folded
+- if/else-if branches with a false condition are dropped and a true
+  condition makes its branch the last one; while and for loops whose
+  condition is false are removed
+The AST given is not modified: nodes that change are copied with
+parser.replace. Statements and conditions are processed with explicit
+stacks, like in the emitter.
+"""
+
+import operator
+from collections import Counter
+from parser import (
+    Module, Print, Variable, IfStatement, BinaryCondition,
+    LogicalCondition, WhileStatement, VarUpdate, ForStatement, walk, replace
+)
+
+COMPARISONS = {
+    '==': operator.eq, '!=': operator.ne, '<': operator.lt,
+    '>': operator.gt, '<=': operator.le, '>=': operator.ge,
+}
+
+
+def literal_kind(value):
+    # int or bool for the literals the pass can evaluate, otherwise None
+    if value == 'true' or value == 'false':
+        return bool
+    if value.isdigit():
+        return int
+    return None
+
+
+def known_value(cond):
+    # 'true' or 'false' for a folded condition, otherwise None
+    if isinstance(cond, BinaryCondition) and not cond.operator and cond.left in ('true', 'false'):
+        return cond.left
+    return None
+
+
+def constant_condition(value, node):
+    # condition that is always value, at the position of node
+    return BinaryCondition('true' if value else 'false', '', '', node.pos, node.end)
+
+
+def fold_binary(cond, constants):
+    left = constants.get(cond.left, cond.left)
+    if not cond.operator:
+        if left in ('true', 'false'):
+            return constant_condition(left == 'true', cond)
+        return cond if left is cond.left else replace(cond, left=left)
+
+    right = constants.get(cond.right, cond.right)
+    left_kind, right_kind = literal_kind(left), literal_kind(right)
+    if left_kind is int and right_kind is int:
+        return constant_condition(COMPARISONS[cond.operator](int(left), int(right)), cond)
+    if left_kind is bool and right_kind is bool and cond.operator in ('==', '!='):
+        return constant_condition(COMPARISONS[cond.operator](left, right), cond)
+    if left is cond.left and right is cond.right:
+        return cond
+    return replace(cond, left=left, right=right)
+
+
+def fold_logical(cond, left, right):
+    # cond with its operands folded to left and right
+    left_value, right_value = known_value(left), known_value(right)
+    if cond.operator == '&&':
+        if left_value == 'false' or right_value == 'false':
+            return constant_condition(False, cond)
+        if left_value == 'true':
+            return right
+        if right_value == 'true':
+            return left
+    else:
+        if left_value == 'true' or right_value == 'true':
+            return constant_condition(True, cond)
+        if left_value == 'false':
+            return right
+        if right_value == 'false':
+            return left
+    if left is cond.left and right is cond.right:
+        return cond
+    return replace(cond, left=left, right=right)
+
+
+def fold_condition(cond, constants):
+    """
+    Condition equivalent to cond, with the values of constants substituted
+    and literal parts evaluated. A condition whose value is known becomes a
+    bare BinaryCondition of 'true' or 'false'.
+    constants maps variable names to their literal value.
+    """
+
+    results = []
+    pending = [cond] # next item last; 1-tuples combine the two last results
+    while pending:
+        item = pending.pop()
+        if isinstance(item, tuple):
+            right = results.pop()
+            left = results.pop()
+            results.append(fold_logical(item[0], left, right))
+        elif isinstance(item, LogicalCondition):
+            pending += ((item,), item.right, item.left)
+        elif isinstance(item, BinaryCondition):
+            results.append(fold_binary(item, constants))
+        else:
+            raise NotImplementedError(f'No folding for {type(item).__name__}')
+    return results[0]
+
+
+def assignment_counts(mod):
+    # name -> number of declarations and updates of it anywhere in the module
+    return Counter(node.name for node in walk(mod) if isinstance(node, (Variable, VarUpdate)))
+
+
+def optimize_statements(stmts, counts):
+    """
+    Optimized copy of a list of statements.
+    counts is assignment_counts of the whole module. Statements are visited
+    in source order, so a constant is only substituted after its declaration.
+    """
+
+    out = []
+    constants = {} # name -> literal value
+    pending = [(stmt, out) for stmt in reversed(stmts)] # (statement, list to append it to), next item last
+
+    def push_block(stmts, body):
+        pending.extend((stmt, body) for stmt in reversed(stmts))
+
+    while pending:
+        item, target = pending.pop()
+        if isinstance(item, Variable):
+            if counts[item.name] == 1 and literal_kind(item.value):
+                constants[item.name] = item.value
+            target.append(item)
+
+        elif isinstance(item, (Print, VarUpdate)):
+            target.append(item)
+
+        elif isinstance(item, IfStatement):
+            branches = [] # (if node, folded condition) of the branches that can run
+            otherwise = None
+            node = item
+            while True:
+                cond = fold_condition(node.condition, constants)
+                value = known_value(cond)
+                if value == 'true':
+                    otherwise = node.body # always taken, later branches are dead
+                    break
+                if value is None:
+                    branches.append((node, cond))
+                if node.else_if is None:
+                    otherwise = node.else_body
+                    break
+                node = node.else_if
+
+            if not branches:
+                # only the else block (or nothing) is left, its statements
+                # replace the if statement
+                push_block(otherwise or [], target)
+                continue
+
+            # rebuild the chain from its last branch
+            blocks = [] # (statements, body of the copy), last branch first
+            chain = None
+            else_body = None
+            if otherwise:
+                else_body = []
+                blocks.append((otherwise, else_body))
+            for node, cond in reversed(branches):
+                body = []
+                chain = replace(node, condition=cond, body=body, else_if=chain,
+                                else_body=else_body if chain is None else None)
+                blocks.append((node.body, body))
+            target.append(chain)
+            for stmts, body in blocks: # first branch pushed last, so it is done first
+                push_block(stmts, body)
+
+        elif isinstance(item, WhileStatement):
+            cond = fold_condition(item.condition, constants)
+            if known_value(cond) == 'false':
+                continue
+            body = []
+            target.append(replace(item, condition=cond, body=body))
+            push_block(item.body, body)
+
+        elif isinstance(item, ForStatement):
+            cond = item.condition
+            if cond is not None:
+                cond = fold_condition(cond, constants)
+                if known_value(cond) == 'false':
+                    # only the initialization runs
+                    if item.init is not None:
+                        pending.append((item.init, target))
+                    continue
+            body = []
+            target.append(replace(item, condition=cond, body=body))
+            push_block(item.body, body)
+
+        else:
+            raise NotImplementedError(f'No optimization for {type(item).__name__}')
+    return out
+
+
+def optimize_module(mod):
+    """
+    Optimized copy of a Module AST node, see the module docstring.
+    """
+
+    return Module(optimize_statements(mod.body, assignment_counts(mod)))
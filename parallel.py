@@ -0,0 +1,388 @@
+"""
+Parallel translation of a single large file.
+The source is cut into chunks at points where the serial lexer is between
+two tokens, each chunk is lexed in a worker process, and the token arrays
+are joined back together, giving exactly the tokens of lex_java_master.
+The tokens are then cut into segments of whole top-level statements, which
+worker processes parse and emit independently; their code is written out in
+source order, giving exactly the output of main.translate_to. The emitter
+needs the types declared before a segment (see emitter.write_stmt), which are
+taken from a scan of the tokens and checked against what the workers parsed.
+
+A lexing cut is placed right after a ';' or '}' token. Those characters only
+occur as symbol tokens or inside literals and comments, so a cheap pre-scan
+that skips literals and comments with the lexer's own patterns finds them.
+Starting after a non-word character also means the \\b of the keyword
+patterns sees the same thing at the start of a chunk as in the whole source.
+"""
+
+from __future__ import annotations
+import io
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from rules import TOKEN_PATTERNS, TYPE_TOKEN_KINDS
+from lexer import (
+    TokenBuffer, LineIndex, KIND_IDS, lex_into_buffer, _unexpected_character
+)
+from parser import Cursor, StreamCursor, parse_statement
+from emitter import CodeWriter, write_stmt, write_prelude, write_epilogue, declare
+
+# chunks smaller than this are not worth a worker process
+MIN_CHUNK = 1024 * 1024 # characters
+MIN_SEGMENT = 100_000 # tokens
+SEGMENTS_PER_JOB = 4 # more segments than workers, so one slow segment does not idle the others
+
+# pre-scan: runs of code, and the literals and comments that may contain
+# ';' or '}'; literal and comment alternatives are tried in the lexer's order
+# (comments before strings), anything else is one character (a '/' that is a
+# division, a quote that starts no literal)
+_SCAN_PATTERN = re.compile('|'.join([
+    r'(?P<CODE>[^"\'/]+)',
+    TOKEN_PATTERNS['LINE_COMMENT'],
+    TOKEN_PATTERNS['BLOCK_COMMENT'],
+    TOKEN_PATTERNS['STRING'],
+    TOKEN_PATTERNS['CHAR_LITERAL'],
+    r'[\s\S]',
+]))
+_CUT = re.compile(r'[;}]')
+
+
+def split_points(src: str, parts: int):
+    """
+    Offsets [0, ..., len(src)] cutting src into at most parts chunks of
+    about the same size, each starting right after a ';' or '}' token.
+    """
+
+    size = len(src)
+    step = size // parts
+    cuts = [0]
+    target = step # the next cut is the first one at or after target
+    for m in _SCAN_PATTERN.finditer(src):
+        if len(cuts) == parts:
+            break
+        if m.lastgroup != 'CODE' or m.end() <= target:
+            continue
+        pos = max(m.start(), target)
+        while len(cuts) < parts:
+            # a long run of code can hold several cuts
+            cut = _CUT.search(src, pos, m.end())
+            if cut is None:
+                break
+            cuts.append(cut.end())
+            target = max(cut.end(), len(cuts) * step)
+            pos = target
+            if pos >= m.end():
+                break
+    if cuts[-1] != size:
+        cuts.append(size)
+    return cuts
+
+
+def _lex_chunk(task):
+    # worker: token arrays of one chunk, positions relative to the whole source
+    chunk, offset = task
+    buf = TokenBuffer(chunk)
+    error = lex_into_buffer(buf, chunk, offset)
+    return buf.kinds, buf.starts, buf.ends, error
+
+
+def lex_buffer_parallel(src: str, jobs: int | None = None, pool: ProcessPoolExecutor | None = None):
+    """
+    Lex src into a TokenBuffer using up to jobs worker processes (default:
+    the number of CPUs), from pool if one is given. Returns (buffer, error)
+    where error is the position of the first unexpected character, in which
+    case the buffer holds the tokens before it and no EOF token.
+    A source too small to give every worker MIN_CHUNK characters is lexed
+    in fewer processes, down to lexing it here without a pool.
+    """
+
+    jobs = jobs or os.cpu_count() or 1
+    parts = max(1, min(jobs, len(src) // MIN_CHUNK))
+    buf = TokenBuffer(src)
+    if parts == 1:
+        error = lex_into_buffer(buf, src)
+    else:
+        cuts = split_points(src, parts)
+        tasks = [(src[start:end], start) for start, end in zip(cuts, cuts[1:])]
+        error = None
+        own_pool = pool is None
+        if own_pool:
+            pool = ProcessPoolExecutor(max_workers=len(tasks))
+        try:
+            for kinds, starts, ends, error in pool.map(_lex_chunk, tasks):
+                buf.kinds.extend(kinds)
+                buf.starts.extend(starts)
+                buf.ends.extend(ends)
+                if error is not None:
+                    break # the serial lexer stops at the first error
+        finally:
+            if own_pool:
+                pool.shutdown()
+    if error is None:
+        buf.append(KIND_IDS['EOF'], len(src), len(src))
+    return buf, error
+
+
+def _tokens_until_error(buf, src, error, lines):
+    # the tokens before the error, then the error, when the consumer gets there
+    yield from buf
+    raise _unexpected_character(src, error, lines)
+
+
+def lex_parallel(src: str, lines: LineIndex | None = None, jobs: int | None = None):
+    """
+    Tokenize Java source code with lex_buffer_parallel.
+    Returns the TokenBuffer, which a parser Cursor uses directly. With a
+    lexical error, returns a generator that raises it after the tokens
+    before it, as the serial lexer does.
+    """
+
+    buf, error = lex_buffer_parallel(src, jobs)
+    if error is None:
+        return buf
+    return _tokens_until_error(buf, src, error, lines)
+
+
+_IF = KIND_IDS['if_keyword']
+_COMPOUND = {_IF, KIND_IDS['while_keyword'], KIND_IDS['for_keyword']}
+_ELSE = KIND_IDS['else_keyword']
+_SEMICOLON = KIND_IDS['semicolon']
+_LEFT_BRACE = bytes([KIND_IDS['left_brace']])
+_RIGHT_BRACE = bytes([KIND_IDS['right_brace']])
+# a type keyword, a name and '=': a declaration, in a statement or a for header
+_DECLARATION = re.compile(b'[%s]%s%s' % (
+    b''.join(re.escape(bytes([KIND_IDS[kind]])) for kind in TYPE_TOKEN_KINDS),
+    re.escape(bytes([KIND_IDS['identifier']])), re.escape(bytes([KIND_IDS['assign']]))))
+
+
+def _block_end(data, i, n):
+    # index after the brace closing the first block opened at or after i,
+    # n if the block is not closed
+    start = data.find(_LEFT_BRACE, i)
+    if start == -1:
+        return n
+    depth = 1
+    j = start + 1
+    while True:
+        close = data.find(_RIGHT_BRACE, j)
+        if close == -1:
+            return n
+        depth += data.count(_LEFT_BRACE, j, close) - 1
+        j = close + 1
+        if depth <= 0:
+            return j
+
+
+def statement_ends(kinds):
+    """
+    Generator of the token index one past each top-level statement, found
+    the way the parser reads them: an if, while or for statement ends with
+    the brace closing its body (for an if, the body of its last else
+    branch), any other statement at the first semicolon, which is also
+    where the parser stops skipping a statement it does not know.
+    kinds is the kinds array of a TokenBuffer ending with the EOF token.
+    """
+
+    data = kinds.tobytes() # one byte per token, searched with bytes.find
+    n = len(data) - 1 # the EOF token is not part of any statement
+    i = 0
+    while i < n:
+        kind = data[i]
+        if kind in _COMPOUND:
+            i = _block_end(data, i, n)
+            # else if and else branches continue an if statement
+            while kind == _IF and i < n and data[i] == _ELSE:
+                kind = data[i + 1]
+                i = _block_end(data, i, n)
+        else:
+            i = data.find(_SEMICOLON, i) + 1 or n
+        yield i
+
+
+def top_level_segments(kinds, parts):
+    """
+    (first, end) token index ranges cutting the tokens into about parts
+    segments of whole top-level statements. A segment never ends right
+    before an else, so the parser sees the same thing after its last if
+    statement as in the whole token stream.
+    """
+
+    n = len(kinds) - 1
+    step = max(1, n // parts)
+    segments = []
+    first = 0
+    target = step
+    for end in statement_ends(kinds):
+        if end >= target and end < n and kinds[end] != _ELSE:
+            segments.append((first, end))
+            first = end
+            target = end + step
+    if first < n:
+        segments.append((first, n))
+    return segments
+
+
+def declared_types(buf, data, first, end, types):
+    """
+    Add the declarations found in the tokens first to end of buf to types
+    (see emitter.declare) and return the entries that changed.
+    data is buf.kinds as bytes. Declarations in statements the parser skips
+    are counted too, which the check in translate_parallel_to catches.
+    """
+
+    src, starts, ends = buf.src, buf.starts, buf.ends
+    changed = {}
+    for m in _DECLARATION.finditer(data, first, end):
+        i = m.start()
+        name = src[starts[i + 1]:ends[i + 1]]
+        if declare(types, name, src[starts[i]:ends[i]].lower()):
+            changed[name] = types[name]
+    return changed
+
+
+def _translate_segment(task):
+    """
+    Worker: (Python code, changed types) of the top-level statements in one
+    segment, or None when the segment does not end between two statements
+    after all (the parser skipped an unknown statement up to the end of a
+    segment that is not the last one; the serial parser would have skipped
+    further). The changed types are the entries of the declared types the
+    segment's declarations changed.
+    """
+
+    text, base, kinds, starts, ends, last, buffered, main_function, types = task
+    buf = TokenBuffer(text, base)
+    buf.kinds, buf.starts, buf.ends = kinds, starts, ends
+    buf.append(KIND_IDS['EOF'], base + len(text), base + len(text))
+    c = Cursor(list(buf)) # Token objects built once, not on every peek
+    w = CodeWriter()
+    if main_function:
+        w.indent()
+    before = dict(types)
+    while c.peek().kind != 'EOF':
+        stmt = parse_statement(c)
+        if stmt:
+            write_stmt(w, stmt, buffered, None, types)
+        elif kinds[c.i - 1] != _SEMICOLON and not last:
+            return None
+    changed = {name: hint for name, hint in types.items() if before.get(name, '') != hint}
+    return w.getvalue(), changed
+
+
+def _segment_task(buf, first, end, buffered, main_function, types):
+    start, stop = buf.starts[first], buf.ends[end - 1]
+    return (buf.src[start:stop], start, buf.kinds[first:end], buf.starts[first:end],
+            buf.ends[first:end], end == len(buf) - 1, buffered, main_function, types)
+
+
+def _emit_rest(out, c, buffered, main_function, types):
+    # parse and emit the statements from the cursor's position in this
+    # process; True if there were any
+    w = CodeWriter()
+    if main_function:
+        w.indent()
+    wrote = False
+    while c.peek().kind != 'EOF':
+        stmt = parse_statement(c)
+        if stmt:
+            write_stmt(w, stmt, buffered, None, types)
+            out.write(w.getvalue())
+            w.parts.clear()
+            wrote = True
+    return wrote
+
+
+def translate_parallel_to(src: str, out, jobs: int | None = None, buffered: bool = False,
+                          main_function: bool = False):
+    """
+    Translate Java source and write the Python code to the text stream out,
+    like main.translate_to, using up to jobs worker processes (default: the
+    number of CPUs) to lex, parse and emit.
+    Segments are handed to the workers a few at a time and their code is
+    written in source order as it arrives. From a segment that fails (a
+    syntax error, or a cut that turns out not to be between statements) on,
+    the rest is translated in this process, so output and errors are those
+    of the serial translation.
+    buffered and main_function are as in emitter.emit_module.
+    """
+
+    jobs = jobs or os.cpu_count() or 1
+    lines = LineIndex(src)
+    w = CodeWriter()
+    write_prelude(w, buffered, main_function)
+    out.write(w.getvalue())
+    w.parts.clear()
+    empty = True # no statement written yet
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        buf, error = lex_buffer_parallel(src, jobs, pool)
+        if error is not None:
+            # statements before the error are translated, then it is raised,
+            # unless a syntax error comes first
+            tokens = _tokens_until_error(buf, src, error, lines)
+            _emit_rest(out, StreamCursor(tokens, lines), buffered, main_function, {})
+
+        n = len(buf) - 1
+        parts = min(jobs * SEGMENTS_PER_JOB, n // MIN_SEGMENT)
+        segments = iter(top_level_segments(buf.kinds, parts) if parts > 1 else [])
+        data = buf.kinds.tobytes()
+        scanned = {} # declared types before the next segment to submit, from the token scan
+        in_flight = deque() # (first, end, types given, types changed by the scan, future) in source order
+
+        def submit(first, end):
+            given = dict(scanned)
+            changed = declared_types(buf, data, first, end, scanned)
+            task = _segment_task(buf, first, end, buffered, main_function, given)
+            in_flight.append((first, end, given, changed, pool.submit(_translate_segment, task)))
+
+        for segment in segments:
+            submit(*segment)
+            if len(in_flight) == 2 * jobs:
+                break
+        resume = 0 # first token not translated by a worker
+        types = {} # declared types before resume
+        while in_flight:
+            first, end, given, changed, future = in_flight.popleft()
+            try:
+                result = future.result()
+            except Exception:
+                result = None # raised again by the serial parser below, with its location
+            if result is None:
+                resume, types = first, given
+                break
+            text, parsed = result
+            out.write(text)
+            empty = empty and not text
+            if parsed != changed:
+                # the scan got the declarations wrong, so the types given to
+                # later segments are too; this segment's code is right
+                resume, types = end, {**given, **parsed}
+                break
+            segment = next(segments, None)
+            if segment is not None:
+                submit(*segment)
+            resume, types = (n, scanned) if not in_flight else (in_flight[0][0], in_flight[0][2])
+        for *_, future in in_flight:
+            future.cancel()
+
+        c = Cursor(buf, lines)
+        c.i = resume
+        if _emit_rest(out, c, buffered, main_function, types):
+            empty = False
+
+    write_epilogue(w, buffered, main_function, empty)
+    out.write(w.getvalue())
+    out.flush()
+
+
+def translate_parallel(src: str, jobs: int | None = None, buffered: bool = False,
+                       main_function: bool = False) -> str:
+    """
+    translate_parallel_to, returning the code as a string.
+    """
+
+    out = io.StringIO()
+    translate_parallel_to(src, out, jobs, buffered, main_function)
+    return out.getvalue()
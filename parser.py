@@ -1,44 +1,123 @@
 """
 Parser module for Java-to-Python translation.
-Implements a recursive descent parser that converts tokens into an Abstract Syntax Tree (AST).
+Implements a descent parser that converts tokens into an Abstract Syntax Tree (AST).
+Nested blocks and conditions are parsed with explicit stacks rather than recursion.
 Performs syntax analysis and builds a tree representation of the program structure.
 """
 
+from __future__ import annotations # annotations stay unevaluated strings
 from rules import PRINT_RECEIVER, PRINT_FIELD, PRINT_METHODS, TYPE_TOKEN_KINDS, PRINTABLE_KINDS, LITERAL_KINDS, VALUE_KINDS
-from dataclasses import dataclass
-from typing import List, Union, Optional
-from lexer import Token
+from lexer import Token, TokenBuffer, LineIndex
 # AST node classes
-# dataclasses represent nodes in the AST
-# dataclasses generate automatically __init__ and other methods
+# the annotated class attributes of a Node subclass are its fields, and
+# __init__, __repr__ and __eq__ are generated from them, as dataclasses would
+# (importing dataclasses and typing took longer than translating a small file)
+# pos and end are the source span of a node: the offset of its first token
+# and the offset just after its last one; they are left out of comparisons,
+# so nodes with the same structure are equal wherever they are
 
-@dataclass
-class Module:
+POSITION = object() # default of source_pos() fields
+
+def source_pos():
+    return POSITION
+
+class Node:
+    """
+    Base class of the AST nodes.
+    _fields lists the field names in constructor order, _compared the ones
+    __eq__ compares. Nodes are mutable and, like dataclasses with eq, unhashable;
+    _intern_key gives the hashable key of a node for an Interner.
+    """
+    _fields = ()
+    _compared = ()
+    __hash__ = None
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        names = tuple(cls.__annotations__)
+        defaults = {}
+        params = []
+        for name in names:
+            default = cls.__dict__.get(name, params) # params: no default
+            if default is params:
+                params.append(name)
+            else:
+                defaults[f'_default_{name}'] = None if default is POSITION else default
+                params.append(f'{name}=_default_{name}')
+        compared = tuple(name for name in names if cls.__dict__.get(name) is not POSITION)
+        cls._fields = names
+        cls._compared = compared
+        
+        # generated like the dataclass methods: one function per class, with
+        # the fields spelled out, is much faster than looping over _fields
+        this = ', '.join(f'self.{name}' for name in compared)
+        that = ', '.join(f'other.{name}' for name in compared)
+        src = (f'def __init__(self, {", ".join(params)}):\n' +
+               ''.join(f'    self.{name} = {name}\n' for name in names) +
+               'def __eq__(self, other):\n'
+               '    if other.__class__ is not self.__class__:\n'
+               '        return NotImplemented\n'
+               f'    return ({this},) == ({that},)\n'
+               'def _intern_key(self):\n' +
+               ''.join(f'    {name} = self.{name}\n'
+                       f'    if {name}.__class__ is list: {name} = _list_key({name})\n'
+                       f'    elif isinstance({name}, Node): {name} = id({name})\n' for name in compared) +
+               f'    return (_cls, {", ".join(compared)})\n')
+        namespace = dict(defaults, _cls=cls, _list_key=_list_key, Node=Node)
+        exec(src, namespace)
+        cls.__init__ = namespace['__init__']
+        cls.__eq__ = namespace['__eq__']
+        cls._intern_key = namespace['_intern_key']
+    
+    def __repr__(self):
+        args = ', '.join(f'{name}={getattr(self, name)!r}' for name in self._fields)
+        return f'{type(self).__name__}({args})'
+
+def _list_key(items):
+    # part of an _intern_key for a list field; in keys child nodes, which are
+    # interned before their parents, are represented by identity
+    return tuple([item if item.__class__ is str else id(item) for item in items])
+
+def replace(node, **changes):
+    """
+    Copy of node with the given fields changed, like dataclasses.replace.
+    """
+    values = {name: getattr(node, name) for name in node._fields}
+    values.update(changes)
+    return type(node)(**values)
+
+def token_end(token):
+    return token.pos + len(token.value)
+
+class Module(Node):
     # root node of AST
     # list of statements in the module
-    body: List[object]
+    body: list[object]
 
-@dataclass
-class Print:
-    args: List[str]
+class Print(Node):
+    args: list[str]
+    newline: bool = True # println, False for print
+    pos: int | None = source_pos()
+    end: int | None = source_pos()
     
-@dataclass
-class Variable:
+class Variable(Node):
     name: str
     value: str
     type_hint: str
+    pos: int | None = source_pos()
+    end: int | None = source_pos()
     
-@dataclass
-class VarUpdate:
+class VarUpdate(Node):
     """
     Represents an increment or decrement operation on a variable.
     examples: x++, y--
     """
     name: str # variable being updated
     delta: int # amount to increment/decrement by
+    pos: int | None = source_pos()
+    end: int | None = source_pos()
     
-@dataclass
-class BinaryCondition: 
+class BinaryCondition(Node): 
     """
     Represent a binary comparison condition.
     Example: x == 5 -> BinaryCondition(left='x', operator='==', right='5')
@@ -49,42 +128,99 @@ class BinaryCondition:
     # operator and right are empty strings
     operator: str
     right: str    
+    pos: int | None = source_pos()
+    end: int | None = source_pos()
     
-@dataclass
-class LogicalCondition:
+class LogicalCondition(Node):
     """
     Represents a logical combination of conditions using && or ||.
     Example: (x > 5 && y < 10) -> LogicalCondition with two BinaryConditions
     
     Allows nested conditions.
     """
-    left: Union['BinaryCondition', 'LogicalCondition'] 
+    left: BinaryCondition | LogicalCondition 
     operator: str #and or or
-    right: Union['BinaryCondition', 'LogicalCondition']
+    right: BinaryCondition | LogicalCondition
+    pos: int | None = source_pos()
+    end: int | None = source_pos()
     
-@dataclass
-class IfStatement:
+class IfStatement(Node):
     """
     Represents if/else-if/else statement chains.
     else-if is represented as a recursive IfStatement.
     """
     
-    condition: Union[BinaryCondition, LogicalCondition]
-    body: List[object]
-    else_if: Optional['IfStatement'] = None # chain next elif (recursive structure)
-    else_body: Optional[List[object]] = None
-    
-@dataclass
-class WhileStatement:
-    condition: Union[BinaryCondition, LogicalCondition]
-    body: List[object]    
+    condition: BinaryCondition | LogicalCondition
+    body: list[object]
+    else_if: IfStatement | None = None # chain next elif (recursive structure)
+    else_body: list[object] | None = None
+    pos: int | None = source_pos()
+    end: int | None = source_pos()
+    
+class WhileStatement(Node):
+    condition: BinaryCondition | LogicalCondition
+    body: list[object]    
+    pos: int | None = source_pos()
+    end: int | None = source_pos()
 
-@dataclass
-class ForStatement:
-    init: Optional[Union[Variable, VarUpdate]] # can be none
-    condition: Optional[Union[BinaryCondition, LogicalCondition]] # can be none
-    update: Optional[VarUpdate] # update expression (can be none)
-    body: List[object]    
+class ForStatement(Node):
+    init: Variable | VarUpdate | None # can be none
+    condition: BinaryCondition | LogicalCondition | None # can be none
+    update: VarUpdate | None # update expression (can be none)
+    body: list[object]    
+    pos: int | None = source_pos()
+    end: int | None = source_pos()
+
+# hash-consing (parse_module(..., intern=True)): structurally equal subtrees
+# become one shared node, which also lets the emitter reuse the code it wrote
+# for it (see emitter.EmitMemo)
+INTERN_TABLE_SIZE = 1 << 16 # distinct nodes kept, the table is cleared when full
+
+class Interner:
+    """
+    Table of shared AST nodes, filled bottom-up by the parser and keyed by
+    Node._intern_key.
+    Calling it with a node whose children are interned returns the first node
+    of the same structure it was given, which is the node itself if there was
+    none. A shared node stands for many places in the source, so its pos and
+    end are None, and it must not be modified; the optimizer copies the nodes
+    it changes.
+    A key holds the ids of child nodes, which stay alive as long as the
+    shared node holding them is in the table, so an id is never reused while
+    a key refers to it, also after the table is cleared.
+    """
+    __slots__ = ('nodes', 'size')
+    
+    def __init__(self, size=INTERN_TABLE_SIZE):
+        self.nodes = {} # _intern_key() -> shared node
+        self.size = size
+    
+    def __call__(self, node):
+        key = node._intern_key()
+        shared = self.nodes.get(key)
+        if shared is None:
+            if len(self.nodes) >= self.size:
+                self.nodes.clear()
+            node.pos = node.end = None
+            self.nodes[key] = shared = node
+        return shared
+
+def walk(node):
+    """
+    Generator of every AST node in the tree under node (including node),
+    visited with an explicit stack.
+    """
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        if isinstance(node, list):
+            pending.extend(reversed(node))
+        elif isinstance(node, Node):
+            yield node
+            for name in reversed(node._fields):
+                value = getattr(node, name)
+                if isinstance(value, (list, Node)):
+                    pending.append(value)
 
 class Cursor:
     
@@ -96,11 +232,17 @@ class Cursor:
     - expect(kind, value): consume token and verify it matches expectations
     
     Lookahead is necessary for determining which rule to apply.
+    Error messages report line/column when a LineIndex of the source is given.
+    With an Interner the parse functions return shared nodes.
     """
     
-    def __init__(self, tokens):
-        self.tokens = list(tokens) # convert generator to list for random access
+    def __init__(self, tokens, lines: LineIndex | None = None, interner: Interner | None = None):
+        # convert generator to list for random access
+        # a TokenBuffer already supports random access and is used as is
+        self.tokens = tokens if isinstance(tokens, TokenBuffer) else list(tokens)
         self.i = 0
+        self.lines = lines
+        self.interner = interner
     
     # look at future tokens without removing them from the token stream
     def peek(self, k = 0):
@@ -119,28 +261,176 @@ class Cursor:
     def expect(self, kind, value = None):
         t = self.pop()
         if t.kind != kind or (value is not None and t.value != value):
-            raise SyntaxError(f"Expected {kind} {value or ''} at {t.pos}, got {t.kind} {t.value!r}")
+            raise SyntaxError(f"Expected {kind} {value or ''} at {self.where(t)}, got {t.kind} {t.value!r}")
         return t
+    
+    # human readable location of a token for error messages
+    def where(self, token):
+        if self.lines is None:
+            return f'position {token.pos}'
+        return self.lines.describe(token.pos)
 
-def parse_module(tokens):
+class StreamCursor(Cursor):
     """
-    Converts token stream into AST Module.
-    Called from main.py after lexical analysis.
+    Cursor that pulls tokens from the lexer generator on demand.
+    Keeps only a small ring buffer of upcoming tokens, so lexing and parsing
+    are interleaved and memory does not grow with the size of the file.
+    The parser never looks further ahead than peek(4).
+    """
+    
+    LOOKAHEAD = 5 # current token plus peek(1) .. peek(4)
+    
+    def __init__(self, tokens, lines: LineIndex | None = None, interner: Interner | None = None):
+        self.tokens = iter(tokens)
+        self.window = [None] * self.LOOKAHEAD # ring buffer of upcoming tokens
+        self.head = 0 # ring slot of the current token
+        self.count = 0 # number of buffered tokens
+        self.last = Token('EOF', '', 0) # last token read, returned past the end
+        self.lines = lines
+        self.interner = interner
+    
+    # read tokens until peek(k) is buffered, False if the stream ends first
+    def _fill(self, k):
+        size = self.LOOKAHEAD
+        while self.count <= k:
+            t = next(self.tokens, None)
+            if t is None:
+                return False
+            self.window[(self.head + self.count) % size] = t
+            self.count += 1
+            self.last = t
+        return True
+    
+    def peek(self, k = 0):
+        if k >= self.LOOKAHEAD:
+            raise ValueError(f'peek({k}) exceeds the lookahead window of {self.LOOKAHEAD} tokens')
+        if self.count <= k and not self._fill(k):
+            return self.last
+        return self.window[(self.head + k) % self.LOOKAHEAD]
+    
+    def pop(self):
+        if self.count == 0 and not self._fill(0):
+            raise IndexError('pop from exhausted token stream')
+        t = self.window[self.head]
+        self.window[self.head] = None # drop the reference so the token can be freed
+        self.head = (self.head + 1) % self.LOOKAHEAD
+        self.count -= 1
+        return t
+
+def iter_statements(tokens, lines: LineIndex | None = None, stream: bool = False, intern: bool = False):
+    """
+    Generator of the top-level statements of a token stream.
+    Each statement is yielded as soon as it is parsed, so callers can emit
+    it before the rest of the input has been read.
+    lines is the LineIndex of the source, used to locate syntax errors.
+    With stream=True tokens are consumed lazily through a StreamCursor
+    instead of being collected into a list first.
+    With intern=True structurally equal subtrees are one shared node without
+    a source position, see Interner.
     """
     
-    c = Cursor(tokens)
-    body = []
+    interner = Interner() if intern else None
+    c = StreamCursor(tokens, lines, interner) if stream else Cursor(tokens, lines, interner)
     
     while c.peek().kind != "EOF":
         stmt = parse_statement(c)
         if stmt: 
-            body.append(stmt)
-    return Module(body=body)
+            yield stmt
+
+def parse_module(tokens, lines: LineIndex | None = None, stream: bool = False, intern: bool = False):
+    """
+    Converts token stream into AST Module.
+    Called from main.py after lexical analysis.
+    Takes the same arguments as iter_statements.
+    """
+    
+    return Module(body=list(iter_statements(tokens, lines, stream, intern)))
+
+class OpenBlock:
+    """
+    A compound statement whose body parse_statement is currently filling.
+    root is the statement handed to the enclosing block once the block is
+    closed; for else-if chains node is the IfStatement of the current branch.
+    """
+    __slots__ = ('root', 'node', 'body', 'in_else')
+    
+    def __init__(self, root, node, body, in_else=False):
+        self.root = root
+        self.node = node
+        self.body = body
+        self.in_else = in_else
 
 def parse_statement(c: Cursor):
     """
-    Parses a single statement by examining the current 
-    token and dispatching to appropriate parse function.
+    Parses a single statement, including the bodies of nested blocks.
+    Open blocks are kept on an explicit stack instead of recursing into
+    each body, so nesting depth is only limited by memory.
+    """
+    blocks = [] # open blocks, innermost last
+    interner = c.interner
+    
+    while True:
+        stmt = parse_statement_or_header(c)
+        if isinstance(stmt, (IfStatement, WhileStatement, ForStatement)):
+            # header parsed up to '{', fill its body next
+            blocks.append(OpenBlock(root=stmt, node=stmt, body=stmt.body))
+        elif not blocks:
+            return stmt if not stmt or interner is None else interner(stmt)
+        elif stmt:
+            blocks[-1].body.append(stmt if interner is None else interner(stmt))
+        
+        # close every block that ends here
+        while True:
+            block = blocks[-1]
+            if c.peek().kind != 'right_brace' and c.peek().kind != 'EOF':
+                break # the block has more statements
+            close = c.expect('right_brace')
+            
+            # else if chains continue in the same open block
+            if (isinstance(block.node, IfStatement) and not block.in_else and
+                c.peek().kind == 'else_keyword'):
+                c.expect('else_keyword')
+                if c.peek().kind == 'if_keyword':
+                    block.node.else_if = parse_if_header(c) # next if becomes elif
+                    block.node = block.node.else_if
+                    block.body = block.node.body
+                else:
+                    # final else
+                    c.expect('left_brace')
+                    block.node.else_body = []
+                    block.body = block.node.else_body
+                    block.in_else = True
+                continue
+            
+            blocks.pop()
+            # the statement and every else-if of its chain end at this brace
+            node = block.root
+            while node is not None:
+                node.end = token_end(close)
+                node = node.else_if if isinstance(node, IfStatement) else None
+            root = block.root if interner is None else intern_chain(block.root, interner)
+            if not blocks:
+                return root
+            blocks[-1].body.append(root)
+
+def intern_chain(root, interner):
+    # shared node of a closed compound statement; the branches of an else-if
+    # chain are interned from the last one up, children before parents
+    chain = [root]
+    while isinstance(chain[-1], IfStatement) and chain[-1].else_if is not None:
+        chain.append(chain[-1].else_if)
+    shared = None
+    for node in reversed(chain):
+        if shared is not None:
+            node.else_if = shared
+        shared = interner(node)
+    return shared
+
+def parse_statement_or_header(c: Cursor):
+    """
+    Parses a simple statement by examining the current token and dispatching
+    to appropriate parse function.
+    For if/while/for only the header is parsed, see parse_*_header.
     """
     peek = c.peek()
     
@@ -154,22 +444,22 @@ def parse_statement(c: Cursor):
         return parse_variable(c)
     
     if peek.kind == 'if_keyword':
-        return parse_if(c)
+        return parse_if_header(c)
     
     if peek.kind == 'while_keyword':
-        return parse_while(c)
+        return parse_while_header(c)
     
     if peek.kind == 'for_keyword':
-        return parse_for(c)
+        return parse_for_header(c)
     
     # increment/decrement
     if (peek.kind == 'identifier' and c.peek(1).kind in ('increment_op', 'decrement_op')
                                   and c.peek(2).kind == 'semicolon'):
-        name = c.pop().value
+        name_token = c.pop()
         op_token = c.pop()
-        c.pop() # skip semicolon
+        semicolon = c.pop()
         delta = 1 if op_token.kind == 'increment_op' else -1
-        return VarUpdate(name=name, delta=delta)
+        return VarUpdate(name=name_token.value, delta=delta, pos=name_token.pos, end=token_end(semicolon))
     
     # skip unknown statements
     while c.peek().kind not in ('semicolon', 'EOF'):
@@ -181,15 +471,16 @@ def parse_statement(c: Cursor):
 
 def parse_print(c: Cursor):
     # consume java pattern: System.out.println(...)
-    c.expect("identifier", PRINT_RECEIVER)
+    start = c.expect("identifier", PRINT_RECEIVER)
     c.expect("dot", '.')          
     c.expect("identifier", PRINT_FIELD)
     c.expect("dot", '.')
     
     # get print method name (println or print)
-    name = c.expect("identifier").value
+    name_token = c.expect("identifier")
+    name = name_token.value
     if name not in PRINT_METHODS:
-        raise SyntaxError(f'Expected {PRINT_METHODS}, got {name}')
+        raise SyntaxError(f'Expected {PRINT_METHODS} at {c.where(name_token)}, got {name}')
     
     c.expect("left_parenthesis", '(') 
     
@@ -199,12 +490,12 @@ def parse_print(c: Cursor):
     if arg_token.kind in PRINTABLE_KINDS:
         arg_token = c.pop()
     else:
-        raise SyntaxError(f'Expected string or identifier at {arg_token.pos}, got {arg_token.kind} {arg_token.value!r}')
+        raise SyntaxError(f'Expected string or identifier at {c.where(arg_token)}, got {arg_token.kind} {arg_token.value!r}')
     
     c.expect("right_parenthesis", ')')
-    c.expect("semicolon", ';')
+    semicolon = c.expect("semicolon", ';')
     
-    return Print([arg_token.value])
+    return Print([arg_token.value], name == 'println', pos=start.pos, end=token_end(semicolon))
 
 def parse_variable(c: Cursor):
     type_token = c.pop()
@@ -215,22 +506,65 @@ def parse_variable(c: Cursor):
     if value_token.kind in VALUE_KINDS:
         value_token = c.pop()
     else: 
-        raise SyntaxError(f'Expected string, number, identifier, true or false but got {value_token.kind} {value_token.value!r}')
+        raise SyntaxError(f'Expected string, number, identifier, true or false at {c.where(value_token)}, but got {value_token.kind} {value_token.value!r}')
     
-    c.expect('semicolon', ';')
+    semicolon = c.expect('semicolon', ';')
     
     # convert java type to python type hint
     type_hint = type_token.value.lower()
     
-    return Variable(name=name_token.value, value=value_token.value, type_hint=type_hint)
+    return Variable(name=name_token.value, value=value_token.value, type_hint=type_hint,
+                    pos=type_token.pos, end=token_end(semicolon))
 
 def parse_condition(c: Cursor):
     
     """
-    Parse conditional expression recursively.
-    Handles binary conditions, boolean literals and logical operators.
-    Calls itself for nested conditions.
+    Parse conditional expression.
+    Handles binary conditions, boolean literals, logical operators and
+    parenthesized conditions.
+    Keeps an explicit stack of open parentheses instead of recursing, so long
+    && / || chains and deep nesting do not hit the recursion limit.
+    Logical operators group to the right: a && b || c is a && (b || c).
     """
+    # (terms, operators) of every open parenthesis level, innermost last
+    levels = [([], [])]
+    interner = c.interner
+    
+    while True:
+        if c.peek().kind == 'left_parenthesis':
+            c.expect('left_parenthesis')
+            levels.append(([], []))
+            continue
+        
+        term = parse_condition_term(c)
+        if interner is not None:
+            term = interner(term)
+        # add the term to its level and close every level that ends here
+        while True:
+            terms, operators = levels[-1]
+            terms.append(term)
+            # check for logical operators, the next term continues this level
+            if c.peek().kind in ('and_op', 'or_op'):
+                operators.append(c.expect(c.peek().kind).value)
+                break
+            
+            # level complete: build LogicalConditions from right to left
+            term = terms[-1]
+            for i in range(len(operators) - 1, -1, -1):
+                term = LogicalCondition(left=terms[i], operator=operators[i], right=term,
+                                        pos=terms[i].pos, end=term.end)
+                if interner is not None:
+                    term = interner(term)
+            levels.pop()
+            if not levels:
+                return term
+            c.expect('right_parenthesis')
+
+def parse_condition_term(c: Cursor):
+    """
+    Parse a single comparison, boolean literal or boolean variable.
+    """
+    start = c.peek()
     # check for comparison operator
     if c.peek().kind == 'identifier':
         identifier = c.expect('identifier').value
@@ -241,91 +575,43 @@ def parse_condition(c: Cursor):
             # parse right side of comparison
             right_kinds = ('number', 'identifier', 'true_literal', 'false_literal')
             if c.peek().kind in right_kinds:
-                right = c.expect(c.peek().kind).value
+                right_token = c.expect(c.peek().kind)
             else:
-                raise SyntaxError(f'Expected {right_kinds} after {operator}, got {c.peek().kind}')
-            term = BinaryCondition(left=identifier, operator=operator, right=right)
-        else:
-            term = BinaryCondition(left=identifier, operator='', right='')
+                raise SyntaxError(f'Expected {right_kinds} after {operator} at {c.where(c.peek())}, got {c.peek().kind}')
+            return BinaryCondition(left=identifier, operator=operator, right=right_token.value,
+                                   pos=start.pos, end=token_end(right_token))
+        return BinaryCondition(left=identifier, operator='', right='', pos=start.pos, end=token_end(start))
     
-    elif c.peek().kind in ('true_literal', 'false_literal'):
+    if c.peek().kind in ('true_literal', 'false_literal'):
         bool_value = c.expect(c.peek().kind).value
-        term = BinaryCondition(left=bool_value, operator='', right='')
+        return BinaryCondition(left=bool_value, operator='', right='', pos=start.pos, end=token_end(start))
     
-    elif c.peek().kind == 'left_parenthesis':
-        c.expect('left_parenthesis')
-        # recursive call to parse nested condition
-        term = parse_condition(c)
-        c.expect('right_parenthesis')
-    
-    else:
-        raise SyntaxError(
-            f'Unexpected token in condition at position {c.peek().pos}: '
-            f'{c.peek().kind} {c.peek().value!r}'
-        )
-    # check for logical operators and build LogicalCondition
-    while c.peek().kind in ('and_op', 'or_op'): 
-        log_op = c.expect(c.peek().kind).value
-        right_term = parse_condition(c)
-        term = LogicalCondition(left=term, operator=log_op, right=right_term)
-    
-    return term
+    raise SyntaxError(
+        f'Unexpected token in condition at {c.where(c.peek())}: '
+        f'{c.peek().kind} {c.peek().value!r}'
+    )
 
-# recursive parsing of if-else chains
-def parse_if(c: Cursor):
-    c.expect('if_keyword')
+# the parse_*_header functions parse a compound statement up to and including
+# its opening brace and return it with an empty body; parse_statement fills it
+
+def parse_if_header(c: Cursor):
+    keyword = c.expect('if_keyword')
     c.expect('left_parenthesis')
     condition = parse_condition(c)
     c.expect('right_parenthesis')
     c.expect('left_brace')
-    
-    # parse body
-    if_body = []
-    while c.peek().kind != 'right_brace' and c.peek().kind != 'EOF':
-        stmt = parse_statement(c)
-        if stmt:
-            if_body.append(stmt)    
-    c.expect('right_brace')
-    
-    # else if chains
-    else_if = None
-    else_body = None
-    
-    if c.peek().kind == 'else_keyword':
-        c.expect('else_keyword')
-        
-        if c.peek().kind == 'if_keyword':
-            else_if = parse_if(c) # recursive call to parse next if as elif            
-        else:    
-            # final else
-            c.expect('left_brace')
-            else_body = []
-            while c.peek().kind != 'right_brace' and c.peek().kind != 'EOF':
-                stmt = parse_statement(c)
-                if stmt:
-                    else_body.append(stmt)
-            c.expect('right_brace')
-          
-    return IfStatement(condition=condition, body=if_body, else_if = else_if, else_body=else_body)
+    return IfStatement(condition=condition, body=[], pos=keyword.pos)
 
-def parse_while(c: Cursor):
-    c.expect('while_keyword')
+def parse_while_header(c: Cursor):
+    keyword = c.expect('while_keyword')
     c.expect('left_parenthesis')
     condition = parse_condition(c)
     c.expect('right_parenthesis')
     c.expect('left_brace')
-    
-    while_body = []
-    while c.peek().kind != 'right_brace' and c.peek().kind != 'EOF':
-        stmt = parse_statement(c)
-        if stmt:
-            while_body.append(stmt)
-    c.expect('right_brace')
-    
-    return WhileStatement(condition=condition, body=while_body)
+    return WhileStatement(condition=condition, body=[], pos=keyword.pos)
 
-def parse_for(c: Cursor):
-    c.expect('for_keyword')
+def parse_for_header(c: Cursor):
+    keyword = c.expect('for_keyword')
     c.expect('left_parenthesis')
     
     init = None
@@ -338,13 +624,17 @@ def parse_for(c: Cursor):
             init = Variable(
                 name=name_token.value, 
                 value=value_token.value, 
-                type_hint=type_token.value.lower()
+                type_hint=type_token.value.lower(),
+                pos=type_token.pos,
+                end=token_end(value_token)
             )
         elif c.peek(1).kind == 'assign':
             name_token = c.expect('identifier')
             c.expect('assign')
             value_token = c.pop()
-            init = Variable(name=name_token.value, value=value_token.value, type_hint='int')
+            # no type: assigns a variable declared before the loop
+            init = Variable(name=name_token.value, value=value_token.value, type_hint='',
+                            pos=name_token.pos, end=token_end(value_token))
     
     c.expect('semicolon')
         
@@ -356,19 +646,43 @@ def parse_for(c: Cursor):
     update = None
     if c.peek().kind != 'right_parenthesis':
         if c.peek().kind == 'identifier' and c.peek(1).kind in ('increment_op', 'decrement_op'):
-            name = c.pop().value
+            name_token = c.pop()
             op_token = c.pop()
             delta = 1 if op_token.kind == 'increment_op' else -1
-            update = VarUpdate(name=name, delta=delta)
+            update = VarUpdate(name=name_token.value, delta=delta, pos=name_token.pos, end=token_end(op_token))
+        elif c.peek().kind == 'identifier':
+            update = parse_step_update(c)
             
     c.expect('right_parenthesis')
     c.expect('left_brace')
     
-    for_body = []
-    while c.peek().kind != 'right_brace' and c.peek().kind != 'EOF':
-        stmt = parse_statement(c)
-        if stmt:
-            for_body.append(stmt)
-    c.expect('right_brace')
-    
-    return ForStatement(init=init, condition=condition, update=update, body=for_body)
\ No newline at end of file
+    if c.interner is not None:
+        init = init and c.interner(init)
+        update = update and c.interner(update)
+    return ForStatement(init=init, condition=condition, update=update, body=[], pos=keyword.pos)
+
+def parse_step_update(c: Cursor):
+    """
+    Parse a for loop update that adds or subtracts a constant:
+    i += 2, i -= 2, i = i + 2 or i = i - 2.
+    """
+    name_token = c.expect('identifier')
+    if c.peek().kind in ('plus_op', 'minus_op') and c.peek(1).kind == 'assign':
+        op_token = c.pop()
+        c.expect('assign')
+    else:
+        c.expect('assign')
+        operand = c.expect('identifier')
+        if operand.value != name_token.value:
+            raise SyntaxError(f'Expected {name_token.value} at {c.where(operand)}, got {operand.value!r}')
+        op_token = c.peek()
+        if op_token.kind not in ('plus_op', 'minus_op'):
+            raise SyntaxError(f'Expected + or - at {c.where(op_token)}, got {op_token.kind} {op_token.value!r}')
+        c.pop()
+    step_token = c.expect('number')
+    if not step_token.value.isdigit():
+        raise SyntaxError(f'Expected an integer step at {c.where(step_token)}, got {step_token.value!r}')
+    delta = int(step_token.value)
+    if op_token.kind == 'minus_op':
+        delta = -delta
+    return VarUpdate(name=name_token.value, delta=delta, pos=name_token.pos, end=token_end(step_token))
@@ -0,0 +1,119 @@
+"""
+Per-phase instrumentation of the translation pipeline.
+A TranslationStats object passed to main.translate_str records wall time,
+token count, AST node counts and optionally peak memory of each phase.
+When no stats object is given the pipeline runs uninstrumented.
+"""
+
+import json
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from lexer import lex_java, LineIndex, DEFAULT_ENGINE
+from parser import parse_module, walk
+from emitter import emit_module
+from optimizer import optimize_module
+
+PHASES = ('lex', 'parse', 'optimize', 'emit')
+
+
+def count_nodes(mod):
+    """
+    Count AST nodes by type name.
+    """
+
+    return Counter(type(node).__name__ for node in walk(mod))
+
+
+class TranslationStats:
+    """
+    Measurements of one translation.
+    phases maps each phase name to {'time': seconds, 'peak_memory': bytes};
+    peak_memory is only recorded with memory=True, since tracing allocations
+    also slows every phase down.
+    """
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.phases = {}
+        self.source_bytes = 0
+        self.tokens = 0
+        self.nodes = Counter()
+        self.output_bytes = 0
+
+    @contextmanager
+    def phase(self, name):
+        # time the body of the with block, and trace its allocations if enabled
+        if self.memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {'time': time.perf_counter() - start}
+            if self.memory:
+                record['peak_memory'] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            self.phases[name] = record
+
+    def to_dict(self):
+        return {
+            'source_bytes': self.source_bytes,
+            'output_bytes': self.output_bytes,
+            'tokens': self.tokens,
+            'nodes': dict(sorted(self.nodes.items())),
+            'phases': self.phases,
+            'total_time': sum(record['time'] for record in self.phases.values()),
+        }
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), indent=2)
+
+    def report(self):
+        """
+        Human readable summary, one line per phase.
+        """
+
+        lines = [f'{self.source_bytes} bytes -> {self.tokens} tokens -> '
+                 f'{sum(self.nodes.values())} AST nodes -> {self.output_bytes} bytes']
+        for name in PHASES:
+            record = self.phases.get(name)
+            if record is None:
+                continue
+            line = f'  {name:8s} {record["time"] * 1000:9.2f} ms'
+            if 'peak_memory' in record:
+                line += f'  peak {record["peak_memory"] / 1e6:8.2f} MB'
+            lines.append(line)
+        lines.append('  nodes: ' + ', '.join(f'{name} {count}' for name, count in sorted(self.nodes.items())))
+        return '\n'.join(lines)
+
+
+def translate_profiled(java_src, stats, engine=DEFAULT_ENGINE, optimize=False, buffered=False, main_function=False,
+                       intern=False):
+    """
+    Translate java_src running each phase to completion in turn, so the
+    phases can be measured separately, and record the results in stats.
+    The optimize phase only runs with optimize=True; buffered and
+    main_function are passed to emit_module. With intern=True the AST shares
+    repeated subtrees and their code is memoized, see main.translate_to.
+    """
+
+    stats.source_bytes = len(java_src.encode('utf-8') if isinstance(java_src, str) else java_src)
+    with stats.phase('lex'):
+        lines = LineIndex(java_src)
+        tokens = list(lex_java(java_src, engine, lines))
+    stats.tokens = len(tokens)
+
+    with stats.phase('parse'):
+        mod = parse_module(tokens, lines, intern=intern)
+    stats.nodes = count_nodes(mod)
+
+    if optimize:
+        with stats.phase('optimize'):
+            mod = optimize_module(mod)
+
+    with stats.phase('emit'):
+        py_code = emit_module(mod, buffered=buffered, main_function=main_function, memoize=intern)
+    stats.output_bytes = len(py_code.encode('utf-8'))
+    return py_code
@@ -0,0 +1,239 @@
+"""
+Long-running translation daemon.
+Listens on a local TCP port or Unix socket and answers translate requests,
+keeping the translator modules, compiled regexes and a cache of recent
+results warm between requests. CPU work runs in a pool of worker processes.
+
+Protocol: one JSON object per line in each direction.
+    request:  {"id": 1, "op": "translate", "source": "<java>", "lexer": "master",
+               "optimize": false, "buffer_prints": false, "main_function": false}
+    response: {"id": 1, "ok": true, "output": "<python>", "cached": false}
+              {"id": 1, "ok": false, "error": {"type": "syntax", "message": "...",
+                                               "line": 3, "column": 7}}
+    request:  {"id": 2, "op": "stats"}
+    response: {"id": 2, "ok": true, "stats": {"requests": 10, "hits": 4, ...}}
+
+Run with:
+    python server.py --port 8765 --workers 4
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import signal
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from main import translate_str
+from lexer import LEX_ENGINES, DEFAULT_ENGINE
+from cache import TranslationCache, DEFAULT_CACHE_SIZE, cache_variant
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MEMORY_CACHE_ENTRIES = 1024
+# boolean request fields -> translate_str options, all false when left out
+OPTIONS = {'optimize': 'optimize', 'buffer_prints': 'buffered', 'main_function': 'main_function'}
+
+# location in lexer and parser error messages
+_LOCATION = re.compile(r'line (\d+), column (\d+)')
+
+
+def translate_request(source, engine=DEFAULT_ENGINE, optimize=False, buffered=False, main_function=False):
+    """
+    Translate one source and return the response payload (without id).
+    Runs in a worker process; errors are returned as diagnostics, not raised.
+    """
+
+    try:
+        return {'ok': True, 'output': translate_str(source, engine, optimize=optimize, buffered=buffered,
+                                                    main_function=main_function)}
+    except SyntaxError as e:
+        error = {'type': 'syntax', 'message': str(e)}
+        m = _LOCATION.search(str(e))
+        if m:
+            error['line'] = int(m.group(1))
+            error['column'] = int(m.group(2))
+        return {'ok': False, 'error': error}
+    except Exception as e:
+        return {'ok': False, 'error': {'type': 'translation', 'message': str(e)}}
+
+
+def _warm_up():
+    # translate a tiny program once so each worker starts with everything loaded
+    translate_str('int x = 0;')
+
+
+class TranslationServer:
+    """
+    Serves translate requests from many concurrent connections.
+    Results are kept in an in-memory LRU cache, and optionally in the on-disk
+    TranslationCache shared with main.py, one per combination of options.
+    """
+
+    def __init__(self, workers=None, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE,
+                 memory_entries=MEMORY_CACHE_ENTRIES):
+        # workers=0 translates on the event loop itself, for tiny inputs or debugging
+        self.executor = None
+        if workers != 0:
+            self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_warm_up)
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self.disk_caches = {} # cache variant -> TranslationCache, opened on first use
+        self.memory = OrderedDict() # (variant, source hash) -> successful response
+        self.memory_entries = memory_entries
+        self.requests = 0
+        self.hits = 0
+        self.errors = 0
+
+    def _disk_cache(self, variant):
+        if self.cache_dir is None:
+            return None
+        disk_cache = self.disk_caches.get(variant)
+        if disk_cache is None:
+            disk_cache = self.disk_caches[variant] = TranslationCache(self.cache_dir, self.cache_size, variant)
+        return disk_cache
+
+    def _remember(self, key, response):
+        # insert as most recently used, keeping at most memory_entries
+        self.memory[key] = response
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False) # least recently used
+
+    async def translate(self, source, engine, optimize=False, buffered=False, main_function=False):
+        self.requests += 1
+        loop = asyncio.get_running_loop()
+        variant = cache_variant(optimize, buffered, main_function)
+        key = (variant, hashlib.sha256(source.encode('utf-8')).hexdigest())
+        disk_cache = self._disk_cache(variant)
+        cached = self.memory.get(key)
+        if cached is None and disk_cache is not None:
+            # file I/O runs in a thread so other connections are not held up
+            output = await loop.run_in_executor(None, disk_cache.get, source)
+            if output is not None:
+                cached = {'ok': True, 'output': output}
+        if cached is not None:
+            self.hits += 1
+            self._remember(key, cached)
+            return dict(cached, cached=True)
+
+        if self.executor is None:
+            response = translate_request(source, engine, optimize, buffered, main_function)
+        else:
+            response = await loop.run_in_executor(self.executor, translate_request, source, engine,
+                                                  optimize, buffered, main_function)
+
+        if response['ok']:
+            self._remember(key, response)
+            if disk_cache is not None:
+                # put may evict, which walks the whole cache directory
+                await loop.run_in_executor(None, disk_cache.put, source, response['output'])
+        else:
+            self.errors += 1
+        return dict(response, cached=False)
+
+    async def respond(self, request):
+        op = request.get('op', 'translate')
+        if op == 'translate':
+            engine = request.get('lexer', DEFAULT_ENGINE)
+            if engine not in LEX_ENGINES:
+                return {'ok': False, 'error': {'type': 'request', 'message': f'Unknown lexer engine {engine!r}'}}
+            source = request.get('source')
+            if not isinstance(source, str):
+                return {'ok': False, 'error': {'type': 'request', 'message': 'Missing "source" string'}}
+            options = {}
+            for field, option in OPTIONS.items():
+                value = request.get(field, False)
+                if not isinstance(value, bool):
+                    return {'ok': False, 'error': {'type': 'request', 'message': f'"{field}" must be a boolean'}}
+                options[option] = value
+            return await self.translate(source, engine, **options)
+        if op == 'stats':
+            return {'ok': True, 'stats': {'requests': self.requests, 'hits': self.hits,
+                                          'errors': self.errors, 'cached_entries': len(self.memory)}}
+        return {'ok': False, 'error': {'type': 'request', 'message': f'Unknown op {op!r}'}}
+
+    async def handle_connection(self, reader, writer):
+        """
+        Read requests line by line; each is answered as soon as it is done,
+        so a client may pipeline requests and match responses by id.
+        """
+
+        lock = asyncio.Lock()
+        tasks = set()
+
+        async def answer(request):
+            response = await self.respond(request)
+            response['id'] = request.get('id')
+            async with lock:
+                writer.write(json.dumps(response).encode('utf-8') + b'\n')
+                await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    request = None
+                if not isinstance(request, dict):
+                    async with lock:
+                        writer.write(b'{"ok": false, "error": {"type": "request", "message": "Invalid JSON"}}\n')
+                    continue
+                task = asyncio.ensure_future(answer(request))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+
+async def serve(server, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    if socket_path:
+        listener = await asyncio.start_unix_server(server.handle_connection, path=socket_path,
+                                                   limit=2 ** 31 - 1)
+        where = socket_path
+    else:
+        listener = await asyncio.start_server(server.handle_connection, host, port,
+                                              limit=2 ** 31 - 1)
+        where = f'{host}:{port}'
+    print(f'Translation server listening on {where}', file=sys.stderr, flush=True)
+    async with listener:
+        await listener.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Java-to-Python translation daemon')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='TCP address to listen on (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='TCP port to listen on (default: %(default)s)')
+    parser.add_argument('--socket', help='Listen on this Unix socket path instead of TCP.')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Worker processes (default: number of CPUs, 0 translates in the server process).')
+    parser.add_argument('--cache-dir', default=None, help='Also keep translations in this on-disk cache.')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+                        help='Maximum size of the on-disk cache in MB (default: %(default)s).')
+    args = parser.parse_args()
+
+    server = TranslationServer(args.workers, args.cache_dir, args.cache_size * 1024 * 1024)
+    # shut down cleanly on SIGTERM too, so the socket file is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
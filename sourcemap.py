@@ -0,0 +1,120 @@
+"""
+Source maps from lines of generated Python code back to the Java source.
+The emitter fills a SourceMap while it writes the code (see
+emitter.MappingWriter), so error tooling can turn a line number from a
+Python traceback into the Java line it was translated from.
+"""
+
+import json
+import re
+from array import array
+
+FORMAT_VERSION = 1
+
+
+class SourceMap:
+    """
+    Line-to-line table from generated Python code to Java source.
+    Stored as segments: a segment starts at python_lines[i] and covers every
+    following line up to the next segment, all translated from the Java code
+    at java_lines[i], java_columns[i] (1-based). Lookups are a binary search.
+    A segment with Java line 0 covers generated lines that come from no Java
+    code, like the main() call of emitter.MAIN_FUNCTION_GUARD.
+    lines is the LineIndex of the Java source, used to turn the offsets
+    recorded during emission into lines and columns; it is not serialized.
+    """
+
+    def __init__(self, source=None, lines=None):
+        self.source = source # name of the Java file, if known
+        self.lines = lines
+        self.python_lines = array('I')
+        self.java_lines = array('I')
+        self.java_columns = array('I')
+
+    def __len__(self):
+        return len(self.python_lines)
+
+    def add(self, python_line, java_line, java_column):
+        # segments must be added in increasing python_line order
+        if self.java_lines and self.java_lines[-1] == java_line and self.java_columns[-1] == java_column:
+            return # same Java position, the current segment goes on
+        self.python_lines.append(python_line)
+        self.java_lines.append(java_line)
+        self.java_columns.append(java_column)
+
+    def add_unmapped(self, python_line):
+        # lines from python_line on come from no Java code
+        self.add(python_line, 0, 0)
+
+    def record(self, python_line, pos):
+        # add a segment for the Java source offset pos
+        java_line, java_column = self.lines.line_col(pos)
+        self.add(python_line, java_line, java_column)
+
+    def lookup(self, python_line):
+        """
+        (java line, java column) the given Python line was translated from,
+        or None for lines before the first segment and unmapped lines.
+        """
+
+        python_lines = self.python_lines
+        lo, hi = 0, len(python_lines)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if python_lines[mid] <= python_line:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == 0 or self.java_lines[lo - 1] == 0:
+            return None
+        return self.java_lines[lo - 1], self.java_columns[lo - 1]
+
+    def to_dict(self):
+        # segments as one flat list of deltas to the previous segment:
+        # python line, java line, java column, ...
+        segments = []
+        prev_python = prev_java = prev_column = 0
+        for python_line, java_line, java_column in zip(self.python_lines, self.java_lines, self.java_columns):
+            segments += (python_line - prev_python, java_line - prev_java, java_column - prev_column)
+            prev_python, prev_java, prev_column = python_line, java_line, java_column
+        return {'version': FORMAT_VERSION, 'source': self.source, 'segments': segments}
+
+    def to_json(self):
+        return json.dumps(self.to_dict(), separators=(',', ':'))
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != FORMAT_VERSION:
+            raise ValueError(f'Unsupported source map version {data.get("version")!r}')
+        source_map = cls(data.get('source'))
+        python_line = java_line = java_column = 0
+        segments = data['segments']
+        for i in range(0, len(segments), 3):
+            python_line += segments[i]
+            java_line += segments[i + 1]
+            java_column += segments[i + 2]
+            source_map.python_lines.append(python_line)
+            source_map.java_lines.append(java_line)
+            source_map.java_columns.append(java_column)
+        return source_map
+
+    @classmethod
+    def from_json(cls, text):
+        return cls.from_dict(json.loads(text))
+
+    def remap_traceback(self, text, python_file):
+        """
+        Rewrite the 'File "python_file", line N' entries of a formatted
+        traceback to point at the Java source instead.
+        """
+
+        pattern = re.compile(r'File "' + re.escape(python_file) + r'", line (\d+)')
+
+        def replace(m):
+            found = self.lookup(int(m.group(1)))
+            if found is None:
+                return m.group(0)
+            java_line, java_column = found
+            return f'File "{self.source or python_file}", line {java_line}, column {java_column}'
+
+        return pattern.sub(replace, text)
@@ -0,0 +1,23 @@
+import os
+from cache import TranslationCache, LOW_WATER
+
+
+def disk_size(cache):
+    return sum(size for _, size, _ in cache._entries())
+
+
+def test_overwrite_counts_entry_once(tmp_path):
+    cache = TranslationCache(str(tmp_path), 10000)
+    for i in range(20):
+        cache.put('int x = 1;', 'x = 1\n' * (i % 3 + 1))
+    assert cache._size == disk_size(cache) == len('x = 1\n' * 2) # the last write, i = 19
+
+
+def test_evict_to_low_water_mark(tmp_path):
+    cache = TranslationCache(str(tmp_path), 1000)
+    for i in range(11):
+        cache.put(f'int x = {i};', 'x' * 99 + '\n')
+        os.utime(cache._path(cache.key(f'int x = {i};')), (i, i)) # distinct last use
+    assert cache._size == disk_size(cache) <= 1000 * LOW_WATER
+    assert cache.get('int x = 0;') is None
+    assert cache.get('int x = 10;') == 'x' * 99 + '\n'
@@ -0,0 +1,86 @@
+import contextlib
+import io
+from main import translate_str, translate_to_code
+
+
+def wrap(body):
+    return f'public class T {{ public static void main(String[] args) {{\n{body}\n}} }}\n'
+
+
+def run_text(src, **options):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        exec(translate_str(src, **options), {'__name__': '__main__'})
+    return out.getvalue()
+
+
+def run_lowered(src, **options):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        exec(translate_to_code(src, **options), {'__name__': '__main__'})
+    return out.getvalue()
+
+
+def test_condition_identifiers_ending_in_f():
+    src = wrap('boolean buf = true;\nint ref = 3;\nint x = 1;\n'
+               'if (buf) { System.out.println("a"); }\n'
+               'if (x < ref) { System.out.println("b"); }')
+    code = translate_str(src)
+    assert 'if buf:' in code
+    assert 'if x < ref:' in code
+    assert run_text(src) == run_lowered(src) == 'a\nb\n'
+
+
+def test_float_literal_suffix():
+    src = wrap('float g = 2.5f;\nif (g > 1) { System.out.println(g); }')
+    code = translate_str(src)
+    assert 'g = 2.5\n' in code
+    assert 'if g > 1:' in code
+    assert run_text(src) == run_lowered(src) == '2.5\n'
+
+
+def test_print_identifiers_ending_in_f():
+    src = wrap('int buf = 7;\nString ref = "r";\nSystem.out.println(buf);\nSystem.out.print(ref);')
+    assert 'print(buf)' in translate_str(src)
+    assert "print(ref, end='')" in translate_str(src)
+    for buffered in (False, True):
+        assert run_text(src, buffered=buffered) == run_lowered(src, buffered=buffered) == '7\nr'
+
+
+def test_range_needs_int_bounds():
+    src = wrap('double lim = 2.5;\nint n = 2;\n'
+               'for (int k = 0; k < lim; k++) { System.out.println(k); }\n'
+               'for (int k = n; k > 0; k--) { System.out.println(k); }')
+    code = translate_str(src)
+    assert 'while k < lim:' in code
+    assert 'for k in range(n, 0, -1):' in code
+    assert run_text(src) == run_lowered(src) == '0\n1\n2\n2\n1\n'
+
+
+def test_range_keeps_final_value_of_outer_variable():
+    for bound in ('n', '3'):
+        src = wrap(f'int n = 3;\nint i = 0;\nfor (i = 0; i < {bound}; i++) {{ }}\nSystem.out.println(i);')
+        assert 'range(' not in translate_str(src)
+        assert run_text(src) == run_lowered(src) == '3\n'
+
+
+def test_long_logical_chain_is_flat():
+    terms = ' && '.join(f'x < {i + 2}' for i in range(5000))
+    src = wrap(f'int x = 1;\nif ({terms}) {{ System.out.println("a"); }}\n'
+               'if (x < 0 || x < 5 && x > 0 && x != 3 || x == 7) { System.out.println("b"); }')
+    assert '(x < 2) and (x < 3) and (x < 4)' in translate_str(src)
+    for options in ({}, {'intern': True}, {'main_function': True}):
+        code = translate_str(src, **options)
+        compile(code, '<test>', 'exec')
+        assert run_text(src, **options) == 'a\nb\n'
+    assert run_lowered(src) == 'a\nb\n'
+
+
+def test_integer_valued_float_literal():
+    src = wrap('float x = 5f;\nfloat y = 2.5F;\nSystem.out.println(x);\nSystem.out.println(y);\n'
+               'if (x > 4) { System.out.println(1F); }')
+    code = translate_str(src)
+    assert 'x = 5.0\n' in code
+    assert 'print(1.0)' in code
+    for buffered in (False, True):
+        assert run_text(src, buffered=buffered) == run_lowered(src, buffered=buffered) == '5.0\n2.5\n1.0\n'
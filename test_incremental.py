@@ -0,0 +1,36 @@
+from incremental import IncrementalTranslation
+from main import translate_str
+
+CLASS = 'public class A {\npublic static void main(String[] args) {\nint x = 1;\nif (x > 0) {\nx++;\n}\n}\n}\n'
+
+
+def check_edit(src, start, end, text):
+    inc = IncrementalTranslation(src)
+    assert inc.output == translate_str(src)
+    new_src = src[:start] + text + src[end:]
+    assert inc.edit(start, end, text) == translate_str(new_src)
+    assert inc.source == new_src
+
+
+def test_edit_completes_statement_skipped_to_end_of_file():
+    src = 'int a = 1;\nfoo '
+    check_edit(src, len(src), len(src), '++;')
+
+
+def test_edit_after_closing_braces():
+    check_edit(CLASS, len(CLASS), len(CLASS), 'int y = 2;\nSystem.out.println(y);\n')
+
+
+def test_edit_turns_skipped_text_into_else():
+    src = 'int x = 1;\nif (x > 0) {\nx++;\n}\nels'
+    check_edit(src, len(src), len(src), 'e {\nx--;\n}\n')
+
+
+def test_edit_after_if_statement():
+    start = CLASS.index('}\n}\n}') + 2
+    check_edit(CLASS, start, start, 'else {\nx--;\n}\n')
+
+
+def test_edit_changes_type_of_loop_bound():
+    src = 'int n = 3;\nfor (int i = 0; i < n; i++) {\nSystem.out.println(i);\n}\n'
+    check_edit(src, 0, 3, 'double')
@@ -0,0 +1,14 @@
+import pytest
+from main import main
+
+
+def test_syntax_error_keeps_existing_output(tmp_path):
+    good, bad, out = tmp_path / 'Good.java', tmp_path / 'Bad.java', tmp_path / 'out.py'
+    good.write_text('int x = 1;\n')
+    bad.write_text('int x = ;\n')
+    main([str(good), str(out)])
+    with pytest.raises(SystemExit) as e:
+        main([str(bad), str(out)])
+    assert e.value.code == 2
+    assert out.read_text() == 'x = 1\n'
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == '.tmp'] == []
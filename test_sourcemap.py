@@ -0,0 +1,18 @@
+from main import translate_str
+from sourcemap import SourceMap
+
+SRC = 'public class T { public static void main(String[] args) {\nint x = 1;\nSystem.out.println(x);\n} }\n'
+
+
+def test_main_function_guard_is_unmapped():
+    for buffered in (False, True):
+        smap = SourceMap('T.java')
+        lines = translate_str(SRC, source_map=smap, buffered=buffered, main_function=True).split('\n')
+        print_line = lines.index('    x = 1') + 2
+        guard_line = lines.index("if __name__ == '__main__':") + 1
+        assert smap.lookup(print_line) == (3, 1)
+        assert smap.lookup(guard_line) is None
+        assert smap.lookup(guard_line + 1) is None
+        restored = SourceMap.from_json(smap.to_json())
+        assert restored.lookup(guard_line + 1) is None
+        assert restored.lookup(print_line) == (3, 1)
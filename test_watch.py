@@ -0,0 +1,27 @@
+import watch
+from batch import translate_tree
+
+
+class StopWatcher(watch.PollWatcher):
+    # ends watch_tree right after its first pass
+    def wait(self):
+        raise KeyboardInterrupt
+
+
+def test_restart_with_other_options_translates_again(tmp_path, monkeypatch):
+    src, out = tmp_path / 'src', tmp_path / 'out'
+    src.mkdir()
+    (src / 'A.java').write_text('int x = 1;\n')
+    assert translate_tree(str(src), str(out), jobs=1) == 0
+    assert (out / 'A.py').read_text() == 'x = 1\n'
+
+    monkeypatch.setattr(watch, 'make_watcher', lambda poll, interval: StopWatcher())
+    watch.watch_tree(str(src), str(out), main_function=True)
+    assert 'def main():' in (out / 'A.py').read_text()
+
+    # same options: up to date outputs are kept
+    (out / 'A.py').write_text('kept\n')
+    watch.watch_tree(str(src), str(out), main_function=True)
+    assert (out / 'A.py').read_text() == 'kept\n'
+    watch.watch_tree(str(src), str(out), intern=True, stream=False)
+    assert (out / 'A.py').read_text() == 'x = 1\n'
@@ -0,0 +1,222 @@
+"""
+Watch mode: keep a directory tree of Java files translated.
+After a first pass over files whose output is missing or out of date, the
+tree is watched and only the files that changed are translated again, in
+this process, so the translator stays loaded between rebuilds.
+Changes are noticed with inotify on Linux and by polling elsewhere; bursts
+of changes (an editor saving several files, a git checkout) are debounced
+into a single rebuild.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import time
+from batch import find_java_files, output_path, translate_file, output_stamp, read_stamp, write_stamp
+from lexer import DEFAULT_ENGINE
+from cache import DEFAULT_CACHE_SIZE
+
+POLL_INTERVAL = 0.5
+DEBOUNCE = 0.1
+# inotify can drop events (queue overflow, network filesystems), so the tree
+# is also rescanned this often when nothing was reported
+RESCAN_INTERVAL = 30.0
+
+# inotify event mask: anything that can change the set or contents of files
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF)
+
+
+def snapshot(src_dir):
+    """
+    Map the relative path of every .java file under src_dir to its
+    (mtime in ns, size). A file counts as changed when either differs.
+    """
+
+    state = {}
+    for rel_path in find_java_files(src_dir):
+        try:
+            st = os.stat(os.path.join(src_dir, rel_path))
+        except FileNotFoundError:
+            continue # removed while walking
+        state[rel_path] = (st.st_mtime_ns, st.st_size)
+    return state
+
+
+def diff(old, new):
+    # (paths added or modified, paths removed)
+    changed = [path for path, sig in new.items() if old.get(path) != sig]
+    removed = [path for path in old if path not in new]
+    return changed, removed
+
+
+class PollWatcher:
+    """
+    Waits a fixed interval between scans of the tree.
+    """
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+
+    def watch_dirs(self, src_dir):
+        pass
+
+    def wait(self):
+        time.sleep(self.interval)
+
+    def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+    Blocks until the kernel reports a change under one of the watched
+    directories. The events themselves are only a wake-up signal, the
+    changed files are found by comparing snapshots.
+    """
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+    def watch_dirs(self, src_dir):
+        # inotify is not recursive, every directory needs its own watch;
+        # called after every wake-up to pick up new directories (adding a
+        # watch again for the same directory just returns the existing one)
+        for root, dirs, files in os.walk(src_dir):
+            self.libc.inotify_add_watch(self.fd, os.fsencode(root), WATCH_MASK)
+
+    def wait(self):
+        ready, _, _ = select.select([self.fd], [], [], RESCAN_INTERVAL)
+        if ready:
+            self.drain()
+
+    def drain(self):
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        os.close(self.fd)
+
+
+def make_watcher(poll=False, interval=POLL_INTERVAL):
+    """
+    An InotifyWatcher where the platform supports it, otherwise (or with
+    poll=True) a PollWatcher.
+    """
+
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError):
+            pass # no libc or no inotify, fall back to polling
+    return PollWatcher(interval)
+
+
+def rebuild(rel_paths, removed, src_dir, out_dir, engine=DEFAULT_ENGINE,
+            cache_dir=None, cache_size=DEFAULT_CACHE_SIZE, **options):
+    """
+    Translate rel_paths and delete the output of removed sources.
+    options are passed on to main.translate_str, as in batch.translate_tree.
+    Prints one summary line and any per-file errors. Returns the number of
+    files that failed.
+    """
+
+    start = time.perf_counter()
+    failed = 0
+    for rel_path in rel_paths:
+        _, _, error, _ = translate_file((rel_path, src_dir, out_dir, engine, cache_dir, cache_size, options))
+        if error is not None:
+            failed += 1
+            print(f'{rel_path}: {error}', file=sys.stderr)
+    for rel_path in removed:
+        try:
+            os.remove(output_path(rel_path, out_dir))
+        except FileNotFoundError:
+            pass
+    elapsed = time.perf_counter() - start
+
+    summary = f'[{time.strftime("%H:%M:%S")}] translated {len(rel_paths) - failed}/{len(rel_paths)} file(s)'
+    if removed:
+        summary += f', removed {len(removed)}'
+    print(f'{summary} in {elapsed * 1000:.1f} ms', flush=True)
+    return failed
+
+
+def stale_files(state, src_dir, out_dir):
+    # sources whose output is missing or older than the source
+    stale = []
+    for rel_path, (mtime_ns, size) in state.items():
+        try:
+            if os.stat(output_path(rel_path, out_dir)).st_mtime_ns >= mtime_ns:
+                continue
+        except FileNotFoundError:
+            pass
+        stale.append(rel_path)
+    return stale
+
+
+def watch_tree(src_dir, out_dir, engine=DEFAULT_ENGINE, cache_dir=None, cache_size=DEFAULT_CACHE_SIZE,
+               poll=False, interval=POLL_INTERVAL, debounce=DEBOUNCE, **options):
+    """
+    Bring out_dir up to date with src_dir, then retranslate changed files
+    until interrupted. The translation options are those of rebuild.
+    Outputs are up to date when they are newer than their source and out_dir
+    was built with the same translator and options (see batch.output_stamp);
+    otherwise the first pass translates every file.
+    """
+
+    watcher = make_watcher(poll, interval)
+    mode = 'polling' if isinstance(watcher, PollWatcher) else 'inotify'
+    try:
+        watcher.watch_dirs(src_dir)
+        state = snapshot(src_dir)
+        stamp = output_stamp(options)
+        stale = stale_files(state, src_dir, out_dir) if read_stamp(out_dir) == stamp else list(state)
+        settings = (engine, cache_dir, cache_size)
+        failed = rebuild(stale, [], src_dir, out_dir, *settings, **options)
+        # until every file was translated once, a restart has to start over
+        write_stamp(out_dir, None if failed else stamp)
+        print(f'Watching {src_dir!r} ({len(state)} files, {mode}), press Ctrl-C to stop', flush=True)
+
+        while True:
+            watcher.wait()
+            watcher.watch_dirs(src_dir)
+            current = snapshot(src_dir)
+            if current == state:
+                continue
+            # wait until the tree stops changing, so a burst is one rebuild
+            while True:
+                time.sleep(debounce)
+                settled = snapshot(src_dir)
+                if settled == current:
+                    break
+                current = settled
+            watcher.drain() # events of the burst are already handled
+
+            changed, removed = diff(state, current)
+            state = current
+            rebuild(changed, removed, src_dir, out_dir, *settings, **options)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()